@@ -1,18 +1,25 @@
 import configparser
+import os
+import threading
 from contextlib import contextmanager
 from enum import Enum, auto
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 
 def load_engine(config_path: str):
     """
-    Create a sql connection based on config from defined ini file
+    Create a sql connection based on config from defined ini file.  A
+    connection string in the DATABASE_URL environment variable is used
+    instead, if set, ex 'sqlite:///loadtest.sqlite' for load tests
     :param config_path: str, path to ini file
     :return: slqalchemy engine
     """
+    if os.environ.get('DATABASE_URL'):
+        return create_engine(os.environ['DATABASE_URL'])
+
     config = configparser.ConfigParser()
     config.read(config_path)
 
@@ -30,11 +37,56 @@ def load_engine(config_path: str):
     return create_engine(conn_string)
 
 
-engine = load_engine('./database/db.ini')
-Session = sessionmaker(bind=engine)
+# db.ini next to this module, independent of the working directory
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db.ini')
+
+"""
+Engine is created, and Session bound to it, on first use by get_engine, so
+importing models needs no db config or connection
+"""
+engine = None
+engine_lock = threading.Lock()
+Session = sessionmaker()
 Base = declarative_base()
 
 
+def get_engine():
+    """
+    Returns the engine, creating it from CONFIG_PATH (or DATABASE_URL) and
+    binding Session to it the first time
+    :return: sqlalchemy engine
+    """
+    global engine
+    with engine_lock:
+        if engine is None:
+            engine = load_engine(CONFIG_PATH)
+            Session.configure(bind=engine)
+        return engine
+
+
+def warm_up(connections: int=None):
+    """
+    Opens and pings connections up front, so the first queries after start
+    do not pay for connecting.  They are returned to the pool for reuse
+    :param connections: int, number to open, defaults to the pool size
+    :return: nothing
+    """
+    db_engine = get_engine()
+    if connections is None:
+        # QueuePool.size() is a method, SingletonThreadPool.size an int
+        size = getattr(db_engine.pool, 'size', 1)
+        connections = size() if callable(size) else size
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = db_engine.connect()
+            opened.append(connection)
+            connection.execute(text('SELECT 1'))
+    finally:
+        for connection in opened:
+            connection.close()
+
+
 class SessionMode(Enum):
     """Enum for use with session_scope to enable/disable .commit() to db"""
     READ = auto()
@@ -43,6 +95,7 @@ class SessionMode(Enum):
 
 @contextmanager
 def session_scope(mode: SessionMode):
+    get_engine()
     session = Session()
     try:
         yield session
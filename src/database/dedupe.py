@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DedupeIndex:
+    """
+    Bounded, time-limited set of reddit fullnames already handled, used in
+    place of a db lookup for every streamed submission.  Least recently seen
+    fullnames are dropped once max_size is reached, and fullnames not seen for
+    max_age seconds are dropped as well; the stream only replays recent
+    submissions, so anything that old will not be seen again
+    :attr max_size: int, max fullnames held
+    :attr max_age: float, seconds a fullname is held after it was last seen
+    """
+    def __init__(self, max_size: int=50000, max_age: float=7 * 24 * 60 * 60):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, fullname: str):
+        with self.lock:
+            seen_at = self.entries.get(fullname)
+            if seen_at is None:
+                return False
+            if time.monotonic() - seen_at > self.max_age:
+                del self.entries[fullname]
+                return False
+            self.entries.move_to_end(fullname)
+            return True
+
+    def add(self, fullname: str):
+        """
+        Adds or refreshes fullname, evicting expired/least recent entries
+        :param fullname: str, reddit fullname ex 't3_a4hafgh'
+        :return: nothing
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.entries[fullname] = now
+            self.entries.move_to_end(fullname)
+            self.evict(now)
+
+    def update(self, fullnames):
+        """
+        Adds many fullnames, ex when seeding from the posts table.  Oldest
+        should come first, so the most recent are the last to be evicted
+        :param fullnames: iterable of str, reddit fullnames
+        :return: nothing
+        """
+        for fullname in fullnames:
+            self.add(fullname)
+
+    def evict(self, now: float):
+        while self.entries:
+            fullname, seen_at = next(iter(self.entries.items()))
+            if len(self.entries) > self.max_size or now - seen_at > self.max_age:
+                self.entries.popitem(last=False)
+            else:
+                break
@@ -0,0 +1,268 @@
+import datetime
+import os
+import socket
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from logger import logger
+from database.base import Base, SessionMode, get_engine, session_scope
+from models.lease import Lease
+
+
+lease_logger = logger.get_logger('Leases', './logfile.log')
+
+# identifies this process in claims, unique per running bot
+NODE_ID = f'{socket.gethostname()}-{os.getpid()}'
+
+"""
+Seconds a claim holds before other nodes may take it over.  Longer than a
+reply can wait in the reply queue, so a slow node is not doubled up on
+"""
+LEASE_SECONDS = 1800
+# claims taken over at most this many times, so a bad link is not retried forever
+MAX_ATTEMPTS = 3
+
+
+def create_tables():
+    """Creates the leases table if it does not exist yet"""
+    Base.metadata.create_all(get_engine(), tables=[Lease.__table__])
+
+
+def utc_now():
+    return datetime.datetime.utcnow()
+
+
+class SqlLeaseBackend:
+    """
+    Submission claims shared by every bot node through the leases table.
+    Claims are atomic: the first insert of a fullname wins, and an expired
+    claim is taken over by a single conditional update, so only one node
+    ever holds a submission.  Claims a node never completes, ie it crashed,
+    expire and are picked up by claim_expired on any node
+    :attr owner: str, this node's id
+    :attr duration: float, seconds each claim holds
+    :attr max_attempts: int, claims per submission before giving up
+    """
+    def __init__(self,
+                 owner: str=NODE_ID,
+                 duration: float=LEASE_SECONDS,
+                 max_attempts: int=MAX_ATTEMPTS,
+                 ):
+        self.owner = owner
+        self.duration = datetime.timedelta(seconds=duration)
+        self.max_attempts = max_attempts
+
+    def claim(self, fullname: str):
+        """
+        Claims fullname for this node
+        :param fullname: str, submission fullname ex 't3_a4hafgh'
+        :return: bool, True if claimed, False if another node holds it or
+        it is already done
+        """
+        now = utc_now()
+        try:
+            with session_scope(SessionMode.WRITE) as session:
+                session.add(Lease(fullname, self.owner, now + self.duration))
+        except IntegrityError:
+            return self.take_over(fullname, now)
+        return True
+
+    def take_over(self, fullname: str, now: datetime.datetime):
+        """
+        Claims fullname if its lease has expired without being done
+        :return: bool, True if claimed
+        """
+        with session_scope(SessionMode.WRITE) as session:
+            claimed = session.query(Lease)\
+                             .filter(Lease.reddit_fullname == fullname,
+                                     Lease.done.is_(False),
+                                     Lease.expires < now,
+                                     Lease.attempts < self.max_attempts)\
+                             .update({Lease.owner: self.owner,
+                                      Lease.expires: now + self.duration,
+                                      Lease.attempts: Lease.attempts + 1},
+                                     synchronize_session=False)
+        if claimed:
+            lease_logger.info(f'took over expired claim on {fullname}')
+        return claimed == 1
+
+    def claim_expired(self, limit: int=20):
+        """
+        Takes over claims that expired before their owner finished
+        :param limit: int, most claims to take
+        :return: list of str, fullnames now claimed by this node
+        """
+        now = utc_now()
+        with session_scope(SessionMode.READ) as session:
+            rows = session.query(Lease.reddit_fullname)\
+                          .filter(Lease.done.is_(False),
+                                  Lease.expires < now,
+                                  Lease.attempts < self.max_attempts)\
+                          .order_by(Lease.expires)\
+                          .limit(limit)\
+                          .all()
+        return [fullname for fullname, in rows if self.take_over(fullname, now)]
+
+    def release(self, fullname: str, delay: float=0):
+        """
+        Gives up this node's claim on fullname without completing it, so any
+        node may take it over once delay seconds pass, ex when its store
+        cannot be fetched right now.  The attempt still counts toward
+        max_attempts
+        :param fullname: str, submission fullname
+        :param delay: float, seconds before the claim may be taken over
+        :return: nothing
+        """
+        expires = utc_now() + datetime.timedelta(seconds=delay)
+        with session_scope(SessionMode.WRITE) as session:
+            session.query(Lease)\
+                   .filter(Lease.reddit_fullname == fullname,
+                           Lease.owner == self.owner,
+                           Lease.done.is_(False))\
+                   .update({Lease.expires: expires}, synchronize_session=False)
+
+    def mark_replied(self, fullname: str):
+        """
+        Records that this node's reply to fullname was sent, before the
+        claim is complete, so a node taking it over only saves the post
+        :param fullname: str, submission fullname
+        :return: nothing
+        """
+        with session_scope(SessionMode.WRITE) as session:
+            session.query(Lease)\
+                   .filter(Lease.reddit_fullname == fullname,
+                           Lease.owner == self.owner)\
+                   .update({Lease.replied: True}, synchronize_session=False)
+
+    def is_replied(self, fullname: str):
+        """
+        :param fullname: str, submission fullname
+        :return: bool, True if a reply to fullname was already sent
+        """
+        with session_scope(SessionMode.READ) as session:
+            return session.query(Lease.reddit_fullname)\
+                          .filter(Lease.reddit_fullname == fullname,
+                                  Lease.replied.is_(True))\
+                          .first() is not None
+
+    def complete(self, fullname: str):
+        """
+        Marks this node's claim on fullname done, so it is never taken over
+        :param fullname: str, submission fullname
+        :return: nothing
+        """
+        self.complete_all([fullname])
+
+    def complete_all(self, fullnames: list):
+        """
+        Marks this node's claims on fullnames done, in one update
+        :param fullnames: list of str, submission fullnames
+        :return: nothing
+        """
+        if not fullnames:
+            return
+        with session_scope(SessionMode.WRITE) as session:
+            session.query(Lease)\
+                   .filter(Lease.reddit_fullname.in_(fullnames),
+                           Lease.owner == self.owner)\
+                   .update({Lease.done: True}, synchronize_session=False)
+
+    def purge(self, max_age: float=7 * 24 * 60 * 60):
+        """
+        Deletes done claims, and claims given up on, older than max_age
+        :param max_age: float, seconds past expiry to keep claims
+        :return: int, claims deleted
+        """
+        cutoff = utc_now() - datetime.timedelta(seconds=max_age)
+        with session_scope(SessionMode.WRITE) as session:
+            return session.query(Lease)\
+                          .filter(Lease.expires < cutoff)\
+                          .delete(synchronize_session=False)
+
+
+class NoLeaseBackend:
+    """
+    Lease backend for a single process that needs no claims, ex backfill,
+    which dedupes against posts already in the db instead.  Every claim
+    succeeds and nothing touches the leases table
+    """
+    def claim(self, fullname: str):
+        return True
+
+    def claim_expired(self, limit: int=20):
+        return []
+
+    def release(self, fullname: str, delay: float=0):
+        pass
+
+    def mark_replied(self, fullname: str):
+        pass
+
+    def is_replied(self, fullname: str):
+        return False
+
+    def complete(self, fullname: str):
+        pass
+
+    def complete_all(self, fullnames: list):
+        pass
+
+    def purge(self, max_age: float=7 * 24 * 60 * 60):
+        return 0
+
+
+class PendingCompletions:
+    """
+    Completes claims only once everything a submission needs has really
+    happened, ex its Post is committed by the writer and its reply is sent,
+    not just queued.  A step that fails forgets the submission, leaving its
+    claim to expire so another node, or this one, retries it
+    :attr complete: callable(fullnames), marks claims done, ex
+    SqlLeaseBackend.complete_all
+    """
+    WRITE = 'write'
+    REPLY = 'reply'
+
+    def __init__(self, complete):
+        self.complete = complete
+        self.waiting = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.waiting)
+
+    def expect(self, fullname: str, steps: set):
+        """
+        :param fullname: str, submission fullname
+        :param steps: set, of WRITE and/or REPLY to wait for
+        :return: nothing
+        """
+        with self.lock:
+            self.waiting[fullname] = set(steps)
+
+    def done(self, fullnames: list, step: str):
+        """
+        Records step finished for fullnames, completing claims with no
+        steps left
+        :param fullnames: list of str, submission fullnames
+        :param step: str, WRITE or REPLY
+        :return: nothing
+        """
+        finished = []
+        with self.lock:
+            for fullname in fullnames:
+                steps = self.waiting.get(fullname)
+                if steps is None:
+                    continue
+                steps.discard(step)
+                if not steps:
+                    del self.waiting[fullname]
+                    finished.append(fullname)
+        self.complete(finished)
+
+    def forget(self, fullname: str):
+        """Stops waiting on fullname, its claim is left to expire"""
+        with self.lock:
+            self.waiting.pop(fullname, None)
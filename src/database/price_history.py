@@ -0,0 +1,177 @@
+import datetime
+
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+
+from logger import logger
+from database.base import Base, SessionMode, get_engine, session_scope
+from models.post import Post
+from models.price import DailyPrice, PriceObservation
+
+
+history_logger = logger.get_logger('PriceHistory', './logfile.log')
+
+
+def create_tables():
+    """
+    Creates the price history tables if they do not exist yet, leaving
+    posts untouched
+    :return: nothing
+    """
+    Base.metadata.create_all(get_engine(), tables=[PriceObservation.__table__,
+                                             DailyPrice.__table__])
+
+
+def record_observations(session, posts: list):
+    """
+    Adds a PriceObservation for each post with an mpn, site, price and date,
+    and folds them into the daily rollups.  Runs in the caller's session so
+    posts, observations and rollups commit together
+    :param session: sqlalchemy Session
+    :param posts: list of Post
+    :return: int, number of observations added
+    """
+    observations = [PriceObservation(post.reddit_fullname, post.mpn, post.site,
+                                     post.price, post.date)
+                    for post in posts
+                    if post.mpn and post.site and post.price is not None and post.date]
+    return add_observations(session, observations)
+
+
+def add_observations(session, observations: list):
+    """
+    Bulk inserts observations and folds them into the daily rollups
+    :param session: sqlalchemy Session
+    :param observations: list of PriceObservation
+    :return: int, number of observations added
+    """
+    if not observations:
+        return 0
+    session.bulk_save_objects(observations)
+    update_rollups(session, observations)
+    return len(observations)
+
+
+def update_rollups(session, observations: list):
+    """
+    Folds observations into the DailyPrice row for each mpn, site and date.
+    Each row is changed by a single UPDATE computing the new values in the
+    db, so writers in other sessions or on other nodes never overwrite each
+    other's counts.  Missing rows are inserted; if another writer inserts
+    the same row first, the insert is rolled back to a savepoint and the
+    UPDATE retried
+    :param session: sqlalchemy Session
+    :param observations: list of PriceObservation
+    :return: nothing
+    """
+    rollups = {}
+    for observation in observations:
+        key = (observation.mpn, observation.site, observation.date)
+        if key not in rollups:
+            rollups[key] = DailyPrice(*key)
+        rollups[key].add(observation.price)
+    for rollup in rollups.values():
+        if fold_rollup(session, rollup):
+            continue
+        try:
+            with session.begin_nested():
+                session.add(rollup)
+        except IntegrityError:
+            fold_rollup(session, rollup)
+
+
+def fold_rollup(session, rollup: DailyPrice):
+    """
+    Adds rollup's prices to the matching DailyPrice row in one UPDATE
+    :param session: sqlalchemy Session
+    :param rollup: DailyPrice, not in the session, prices to fold in
+    :return: bool, True if the row existed
+    """
+    updated = session.query(DailyPrice)\
+                     .filter(DailyPrice.mpn == rollup.mpn,
+                             DailyPrice.site == rollup.site,
+                             DailyPrice.date == rollup.date)\
+                     .update({
+                         DailyPrice.min_price: case(
+                             [(DailyPrice.min_price < rollup.min_price, DailyPrice.min_price)],
+                             else_=rollup.min_price),
+                         DailyPrice.max_price: case(
+                             [(DailyPrice.max_price > rollup.max_price, DailyPrice.max_price)],
+                             else_=rollup.max_price),
+                         DailyPrice.price_sum: DailyPrice.price_sum + rollup.price_sum,
+                         DailyPrice.observations: DailyPrice.observations + rollup.observations,
+                     }, synchronize_session=False)
+    return updated > 0
+
+
+def price_history(mpn: str, site: str=None, since: datetime.date=None):
+    """
+    Every price seen for mpn, served from the (mpn, date) index
+    :param mpn: str, manufacturer part number
+    :param site: str, optional domain to limit to ex 'newegg.com'
+    :param since: date, optional earliest date to include
+    :return: list of (date, site, price) tuples, oldest first
+    """
+    with session_scope(SessionMode.READ) as session:
+        query = session.query(PriceObservation.date,
+                              PriceObservation.site,
+                              PriceObservation.price)\
+                       .filter(PriceObservation.mpn == mpn)
+        if site is not None:
+            query = query.filter(PriceObservation.site == site)
+        if since is not None:
+            query = query.filter(PriceObservation.date >= since)
+        return [tuple(row) for row in query.order_by(PriceObservation.date,
+                                                     PriceObservation.id)]
+
+
+def daily_prices(mpn: str, site: str=None, since: datetime.date=None):
+    """
+    Daily min, max and average price for mpn per site, from the rollups
+    :param mpn: str, manufacturer part number
+    :param site: str, optional domain to limit to ex 'newegg.com'
+    :param since: date, optional earliest date to include
+    :return: list of (date, site, min, max, avg) tuples, oldest first
+    """
+    with session_scope(SessionMode.READ) as session:
+        query = session.query(DailyPrice.date,
+                              DailyPrice.site,
+                              DailyPrice.min_price,
+                              DailyPrice.max_price,
+                              DailyPrice.price_sum,
+                              DailyPrice.observations)\
+                       .filter(DailyPrice.mpn == mpn)
+        if site is not None:
+            query = query.filter(DailyPrice.site == site)
+        if since is not None:
+            query = query.filter(DailyPrice.date >= since)
+        return [(date, site, low, high, total / count)
+                for date, site, low, high, total, count
+                in query.order_by(DailyPrice.date, DailyPrice.site)]
+
+
+def rebuild(chunk_size: int=5000):
+    """
+    Clears the price history tables and rebuilds them from every post
+    already in the db, for use once after create_tables
+    :param chunk_size: int, posts read and written per transaction
+    :return: int, number of observations added
+    """
+    with session_scope(SessionMode.WRITE) as session:
+        session.query(DailyPrice).delete()
+        session.query(PriceObservation).delete()
+    last_id = 0
+    added = 0
+    while True:
+        with session_scope(SessionMode.WRITE) as session:
+            posts = session.query(Post)\
+                           .filter(Post.id > last_id)\
+                           .order_by(Post.id)\
+                           .limit(chunk_size)\
+                           .all()
+            if not posts:
+                break
+            last_id = posts[-1].id
+            added += record_observations(session, posts)
+    history_logger.info(f'rebuilt price history with {added} observations')
+    return added
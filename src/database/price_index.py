@@ -0,0 +1,71 @@
+import datetime
+import threading
+from collections import namedtuple
+
+
+"""
+Lowest and most recent price recorded for an mpn, with the site and date
+each was seen on
+"""
+PriceRecord = namedtuple('PriceRecord', ['min_price', 'min_site', 'min_date',
+                                         'last_price', 'last_site', 'last_date'])
+
+
+class PriceIndex:
+    """
+    In-memory mpn -> PriceRecord index, so replies can show price history
+    without querying the db.  Loaded once from posts, then kept current as
+    posts are saved
+    """
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, mpn: str):
+        """
+        :param mpn: str, manufacturer part number
+        :return: PriceRecord if a price was recorded for mpn, else None
+        """
+        if mpn is None:
+            return None
+        return self.records.get(mpn.upper())
+
+    def add(self, mpn: str, price: int, site: str, date: datetime.date):
+        """
+        Records price as the latest for mpn, and as the lowest if it is.
+        Ignored without both mpn and price
+        :param mpn: str, manufacturer part number
+        :param price: int, rounded price
+        :param site: str, domain price was seen on
+        :param date: date, date price was seen
+        :return: nothing
+        """
+        if not mpn or price is None:
+            return
+        key = mpn.upper()
+        with self.lock:
+            record = self.records.get(key)
+            if record is None or price <= record.min_price:
+                lowest = (price, site, date)
+            else:
+                lowest = record[:3]
+            self.records[key] = PriceRecord(*lowest, price, site, date)
+
+    def update(self, rows):
+        """
+        Adds rows in order, oldest first
+        :param rows: iterable of (mpn, price, site, date)
+        :return: nothing
+        """
+        for mpn, price, site, date in rows:
+            self.add(mpn, price, site, date)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+
+price_index = PriceIndex()
@@ -0,0 +1,200 @@
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from logger import logger
+from database import price_history
+from database.base import SessionMode, session_scope
+from metrics import metrics
+from models.post import Post
+
+
+writer_logger = logger.get_logger('PostWriter', './logfile.log')
+
+flush_seconds = metrics.histogram('bapcs_db_flush_seconds',
+                                  'Time to write a batch of posts')
+rows_written = metrics.counter('bapcs_db_rows_written_total',
+                               'Posts written to db')
+flush_failures = metrics.counter('bapcs_db_flush_failures_total',
+                                 'Batches put back in the buffer after a db error')
+
+
+class PostWriter:
+    """
+    Write-behind buffer for Post rows.  Posts are held until max_batch are
+    waiting or the oldest has waited max_delay seconds, then written in a
+    single bulk insert along with their price history.  Rows whose
+    reddit_fullname is already in the db are dropped from the batch, so one
+    duplicate does not fail the rest.  If the write fails, ie the db is
+    down, the batch goes back in the buffer and is retried after max_delay
+    by the background thread; until then adds only buffer, so callers are
+    not held up by a write per add during an outage
+    :attr max_batch: int, buffered posts that trigger a flush
+    :attr max_delay: float, seconds a post may wait before a flush
+    :attr on_written: callable(posts), called after each committed flush
+    with the posts now in the db, including any already written
+    :attr retry_after: float, monotonic time before which a full buffer is
+    not flushed by add, set after a failed flush; None if the last succeeded
+    """
+    def __init__(self, max_batch: int=50, max_delay: float=30, on_written=None):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_written = on_written
+        self.buffer = []
+        self.oldest = None
+        self.retry_after = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.timer = None
+
+    def start(self):
+        """Starts the background thread that flushes on max_delay"""
+        if self.timer is not None:
+            return
+        self.stopped.clear()
+        self.timer = threading.Thread(target=self.flush_periodically,
+                                      name='post-writer',
+                                      daemon=True)
+        self.timer.start()
+
+    def close(self):
+        """
+        Stops the background thread and writes anything still buffered
+        :return: nothing
+        """
+        self.stopped.set()
+        if self.timer is not None:
+            self.timer.join()
+            self.timer = None
+        self.flush()
+
+    def add(self, post: Post):
+        """
+        Buffers post, flushing if the buffer reached max_batch, unless a
+        failed flush is waiting to be retried
+        :param post: Post, Post instance to write
+        :return: nothing
+        """
+        with self.lock:
+            now = time.monotonic()
+            if not self.buffer:
+                self.oldest = now
+            self.buffer.append(post)
+            full = (len(self.buffer) >= self.max_batch
+                    and (self.retry_after is None or now >= self.retry_after))
+        if full:
+            self.flush()
+
+    def due(self):
+        """Returns True if the oldest buffered post has waited max_delay"""
+        with self.lock:
+            return (bool(self.buffer)
+                    and time.monotonic() - self.oldest >= self.max_delay)
+
+    def flush_periodically(self):
+        while not self.stopped.wait(min(1.0, self.max_delay)):
+            try:
+                if self.due():
+                    self.flush()
+            except Exception as e:
+                writer_logger.error(f'{e.__class__}: {e}')
+
+    def flush(self):
+        """
+        Writes all buffered posts.  On a db error they are put back at the
+        front of the buffer, to be retried after max_delay
+        :return: int, number of rows written
+        """
+        with self.lock:
+            posts, self.buffer = self.buffer, []
+            self.oldest = None
+        if not posts:
+            return 0
+        with self.write_lock, flush_seconds.time():
+            try:
+                try:
+                    written = self.write(posts)
+                except IntegrityError as e:
+                    # maybe another writer inserted one of these since we checked
+                    writer_logger.error(f'{e.__class__}: retrying rows one at a time')
+                    written = self.write_each(posts)
+            except SQLAlchemyError as e:
+                writer_logger.error(f'{e.__class__}: {e}, keeping {len(posts)} posts to retry')
+                flush_failures.inc()
+                self.restore(posts)
+                return 0
+        with self.lock:
+            self.retry_after = None
+        rows_written.inc(written)
+        writer_logger.info(f'written {written} of {len(posts)} posts to db')
+        if self.on_written is not None:
+            try:
+                self.on_written(posts)
+            except Exception as e:
+                writer_logger.error(f'{e.__class__}: {e}')
+        return written
+
+    def restore(self, posts: list):
+        """Puts posts from a failed flush back ahead of any buffered since"""
+        with self.lock:
+            self.buffer = posts + self.buffer
+            self.oldest = time.monotonic()
+            self.retry_after = self.oldest + self.max_delay
+
+    @staticmethod
+    def write(posts: list):
+        """
+        Bulk inserts posts, skipping reddit_fullnames already in the db or
+        repeated within posts
+        :param posts: list of Post
+        :return: int, number of rows written
+        """
+        unique = {}
+        for post in posts:
+            unique.setdefault(post.reddit_fullname, post)
+        with session_scope(SessionMode.WRITE) as session:
+            existing = session.query(Post.reddit_fullname)\
+                              .filter(Post.reddit_fullname.in_(list(unique)))\
+                              .all()
+            for fullname, in existing:
+                del unique[fullname]
+            session.bulk_save_objects(list(unique.values()))
+            price_history.record_observations(session, list(unique.values()))
+        return len(unique)
+
+    @staticmethod
+    def write_each(posts: list):
+        """
+        Inserts posts one per transaction, skipping any whose
+        reddit_fullname is already in the db
+        :param posts: list of Post
+        :return: int, number of rows written
+        :raises IntegrityError: if a post failed for any other reason
+        """
+        written = 0
+        for post in posts:
+            try:
+                with session_scope(SessionMode.WRITE) as session:
+                    # bulk save leaves post detached, so it stays readable after commit
+                    session.bulk_save_objects([post])
+                    price_history.record_observations(session, [post])
+            except IntegrityError:
+                if not is_written(post.reddit_fullname):
+                    raise
+                writer_logger.warning(f'{post.reddit_fullname} already written')
+            else:
+                written += 1
+        return written
+
+
+def is_written(fullname: str):
+    """
+    :param fullname: str, submission fullname
+    :return: bool, True if a Post for fullname is in the db
+    """
+    with session_scope(SessionMode.READ) as session:
+        return session.query(Post.id)\
+                      .filter(Post.reddit_fullname == fullname)\
+                      .first() is not None
@@ -1,25 +1,126 @@
+import atexit
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+# logfile is rotated and gzipped at MAX_BYTES, keeping BACKUP_COUNT archives
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 20
+
+"""
+Error lines logged from the same line of code are sampled: the first
+SAMPLE_BURST in each SAMPLE_WINDOW seconds are kept, then 1 in SAMPLE_RATE.
+Mostly for store parsers, which log an error for every missing xpath
+"""
+SAMPLE_WINDOW = 60
+SAMPLE_BURST = 10
+SAMPLE_RATE = 10
+
+"""
+Absolute logfile path: QueueHandler shared by every logger writing to it.
+A single background listener thread per file does all disk writes
+"""
+_handlers = {}
+_handlers_lock = threading.Lock()
 
 
 def get_logger(name: str, file: str):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    handler = logging.FileHandler(file)
-    handler.setLevel(logging.INFO)
+    handler = get_handler(file)
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
 
-    formatter = logging.Formatter(f'%(asctime)s'
-                                  f'-%(levelname)s'
-                                  f'-%(name)s'
-                                  f'-%(module)s'
-                                  f'-%(lineno)s'
-                                  f'-%(funcName)s'
-                                  f'-%(message).50s')
+    return logger
 
-    handler.setFormatter(formatter)
 
-    logger.addHandler(handler)
+def get_handler(file: str):
+    """
+    Returns the shared queue handler for file, starting its listener on
+    first use
+    :param file: str, logfile path
+    :return: logging.handlers.QueueHandler
+    """
+    path = os.path.abspath(file)
+    with _handlers_lock:
+        if path in _handlers:
+            return _handlers[path]
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, delay=True
+        )
+        file_handler.setLevel(logging.INFO)
+        file_handler.namer = gzip_namer
+        file_handler.rotator = gzip_rotator
+
+        formatter = logging.Formatter(f'%(asctime)s'
+                                      f'-%(levelname)s'
+                                      f'-%(name)s'
+                                      f'-%(module)s'
+                                      f'-%(lineno)s'
+                                      f'-%(funcName)s'
+                                      f'-%(message).50s')
+
+        file_handler.setFormatter(formatter)
+
+        records = queue.Queue()
+        listener = logging.handlers.QueueListener(records, file_handler,
+                                                  respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        handler = logging.handlers.QueueHandler(records)
+        handler.setLevel(logging.INFO)
+        handler.addFilter(SamplingFilter(SAMPLE_WINDOW, SAMPLE_BURST, SAMPLE_RATE))
+
+        _handlers[path] = handler
+        return handler
+
+
+def gzip_namer(name: str):
+    return f'{name}.gz'
+
+
+def gzip_rotator(source: str, dest: str):
+    """Compresses rotated logfile source to dest, then removes source"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
 
-    return logger
 
+class SamplingFilter(logging.Filter):
+    """
+    Passes every record below ERROR.  ERROR records are counted per
+    logger/line of code; within each window, the first burst pass and after
+    that only every rate-th one
+    :attr window: float, seconds before counts reset
+    :attr burst: int, records passed per window before sampling starts
+    :attr rate: int, 1 in rate records passed once sampling
+    """
+    def __init__(self, window: float, burst: int, rate: int):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.rate = rate
+        self.counts = {}
+        self.lock = threading.Lock()
 
+    def filter(self, record: logging.LogRecord):
+        if record.levelno != logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            started, count = self.counts.get(key, (now, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            count += 1
+            self.counts[key] = (started, count)
+        return count <= self.burst or (count - self.burst) % self.rate == 0
@@ -1,68 +1,391 @@
+import argparse
 import datetime
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import praw
 import prawcore
 
-from sqlalchemy import exists
-
 # fixes sys.argv launching ModuleNotFoundError
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from logger import logger
+from database import base, lease, price_history
 from database.base import SessionMode, session_scope
+from database.dedupe import DedupeIndex
+from database.price_index import price_index
+from database.writer import PostWriter
+from metrics import metrics
 from models.post import Post
+from network import breaker, client
+from pipeline.pipeline import Pipeline, Stage
 from reddit.reddit import RedditHandler
+from reddit import subreddits
+from reddit.scheduler import ReplyScheduler
 from stores import registration
+from tracker import tracker
+
 
+# local port to serve metrics on, None to disable
+METRICS_PORT = 9180
+# file to rewrite with current metrics every 15 seconds, None to disable
+METRICS_FILE = None
+# per subreddit stores to reply for/only save, see examples/subreddits.ini
+SUBREDDITS_CONFIG = './reddit/subreddits.ini'
+# most requests one site function makes at once, Microcenter's store fan-out
+STORE_FANOUT = 8
 
-"""
-List of submissions followed since main start, used to mitigate bad links that
-cause exceptions between the parsing stage and the database logging stage.
-Submissions appended here will be skipped on the next bot.run() attempt.
-"""
-FOLLOWED_THIS_SESSION = []
+parse_seconds = metrics.histogram('bapcs_parse_seconds',
+                                  'Time to fetch and parse a post by site')
+requests_per_submission = metrics.histogram(
+    'bapcs_requests_per_submission',
+    'Store requests made to parse a post by site',
+    metrics.COUNT_BUCKETS,
+)
+save_seconds = metrics.histogram('bapcs_save_seconds',
+                                 'Time spent in the database stage per post')
 
 
 class Bot:
     """
-    Bot that will initialize on given subreddit, and scan for products to
-    search/parse for information. Depending on site function configuration,
-    will post comments to submissions
-    :attr site_functions: dictionary mapping domains to .stores functions
+    Bot that will initialize on given subreddits, and scan for products to
+    search/parse for information. Depending on site function and subreddit
+    configuration, will post comments to submissions.  Several subreddits
+    are streamed as one, sharing the pipeline, store sessions, caches and
+    db writer.  Submissions are handed from the stream to a pipeline of
+    parse -> reply -> database stages, so the stream never waits on a
+    store page
+    :attr parse_workers: int, number of submissions parsed concurrently
+    :attr queue_size: int, max submissions waiting at each stage
+    :attr reply_delay: int, least seconds between replies sent; replies are
+    spaced further when reddit's remaining request quota runs low or it
+    rate limits us.  Posts that get no reply are not delayed
+    :attr followed: DedupeIndex, fullnames in the db or followed since start,
+    loaded from the db once.  Also mitigates bad links that cause exceptions
+    between the parsing stage and the database stage, as submissions added
+    here are skipped on the next bot.run() attempt
+    :attr writer: PostWriter, batches Posts from the database stage
+    :attr replies: ReplyScheduler, sends replies queued by the reply stage
+    :attr prices_loaded: bool, True once the price index is filled from the db
+    :attr config: SubredditConfig, stores to reply for or only save per
+    subreddit
+    :attr leases: SqlLeaseBackend, claims submissions so several bots can
+    stream the same subreddits and each post is handled by one
+    :attr completions: PendingCompletions, marks claims done once the Post
+    is committed and any reply sent
+    :attr lease_sweep_interval: float, seconds between checks for claims
+    other nodes let expire
+    :attr backfill_workers: int, submissions parsed concurrently in backfill
+    :attr backfill_batch: int, posts per bulk insert in backfill
+    :attr tracker: PriceTracker, revisits product pages from posts while
+    the pipeline is idle
+    :attr tracker_loaded: bool, True once tracked products are loaded
     """
-    site_functions = registration.site_functions
+    parse_workers = 4
+    queue_size = 100
+    reply_delay = 10
+    lease_sweep_interval = 60
+    backfill_workers = 8
+    backfill_batch = 500
 
-    def __init__(self, sub_to_stream: str):
+    def __init__(self, sub_to_stream: str, subreddit=None, config=None, leases=None):
+        """
+        :param sub_to_stream: str, subreddit name ex 'buildapcsales', or
+        several joined by '+' ex 'buildapcsales+hardwareswap'
+        :param subreddit: praw.models.Subreddit, or a stand-in with a
+        .stream.submissions() generator; created from sub_to_stream if None
+        :param config: SubredditConfig, loaded from SUBREDDITS_CONFIG if None
+        :param leases: lease backend, SqlLeaseBackend for this node if None
+        """
         self.logger = logger.get_logger('Bot', './logfile.log')
         self.logger.info(f'initializing on {sub_to_stream}...')
-        self.subreddit = RedditHandler.get_subreddit(sub_to_stream)
+        if subreddit is None:
+            subreddit = RedditHandler.get_subreddit(sub_to_stream)
+        self.subreddit = subreddit
+        self.pipeline = Pipeline([
+            Stage('parse', self.parse, self.parse_workers, self.queue_size),
+            Stage('reply', self.reply, 1, self.queue_size),
+            Stage('database', self.save_to_database, 1, self.queue_size),
+        ])
+        self.followed = None
+        self.prices_loaded = False
+        if config is None:
+            config = subreddits.load_config(SUBREDDITS_CONFIG)
+        self.config = config
+        self.leases = leases if leases is not None else lease.SqlLeaseBackend()
+        self.completions = lease.PendingCompletions(self.leases.complete_all)
+        self.writer = PostWriter(on_written=self.on_written)
+        self.replies = ReplyScheduler(
+            RedditHandler.reply_to_submission,
+            RedditHandler.get_limits,
+            max_rate=1 / self.reply_delay if self.reply_delay else float('inf'),
+            on_finished=self.on_reply_finished,
+        )
+        self.stopped = threading.Event()
+        self.sweeper = None
+        self.tracker = tracker.PriceTracker(is_idle=self.is_idle)
+        self.tracker_loaded = False
         self.logger.info('initialized')
 
     def run(self):
-        self.load_stores()
+        base.warm_up()
+        if self.followed is None:
+            self.followed = self.load_followed()
+        if not self.prices_loaded:
+            self.load_prices()
+        if not self.tracker_loaded:
+            self.tracker.load()
+            self.tracker_loaded = True
+        # parse workers, plus Microcenter's background inventory refreshes
+        client.size_pool((self.parse_workers + 1) * STORE_FANOUT)
+        client.warm_up(registration.get_sites())
+        for site_name in registration.get_sites():
+            breaker.get_breaker(site_name)
+        self.writer.start()
+        self.replies.start()
+        self.pipeline.start()
+        self.tracker.start()
+        if self.sweeper is None:
+            self.stopped.clear()
+            self.sweeper = threading.Thread(target=self.sweep_leases,
+                                            name='lease-sweeper',
+                                            daemon=True)
+            self.sweeper.start()
         self.logger.info('streaming...')
         for submission in self.subreddit.stream.submissions():
             self.logger.info(f'found {submission.fullname}: {submission.title}')
             if self.has_been_parsed(submission):
                 continue
-            FOLLOWED_THIS_SESSION.append(submission.fullname)
-            site_name, site_function = self.get_site_function(submission.url)
-            if site_function is not None:
-                self.logger.info('gathering data...')
-                product_details, markdown = site_function(submission)
-                post = Post(submission.fullname,
-                            product_details.get('mpn', None),
-                            product_details.get('price', None),
-                            datetime.date.fromtimestamp(submission.created),
-                            site_name)
-                RedditHandler.reply_to_submission(submission, markdown)
-                self.save_to_database(post)
-                time.sleep(10)
+            self.followed.add(submission.fullname)
+            self.queue_submission(submission)
+            self.logger.info(f'queue depths: {self.pipeline.depths()}')
             self.logger.info('waiting for next submission...')
 
+    def queue_submission(self, submission: praw.Reddit.submission, claimed: bool=False):
+        """
+        Puts submission on the pipeline if it links to a store handled in
+        its subreddit, and this node can claim it.  A claim taken over after
+        its reply was sent is only saved to db, so it is not replied twice
+        :param submission: praw.Reddit.submission, submission to handle
+        :param claimed: bool, True if this node already holds the claim
+        :return: bool, True if queued
+        """
+        site_name, site_function = self.get_site_function(submission.url)
+        if site_function is None:
+            return False
+        mode = self.config.mode(submission.subreddit.display_name, site_name)
+        if mode is None:
+            return False
+        if not claimed and not self.leases.claim(submission.fullname):
+            self.logger.info(f'{submission.fullname} claimed by another node')
+            return False
+        if (claimed and mode == subreddits.REPLY
+                and self.leases.is_replied(submission.fullname)):
+            mode = subreddits.DATABASE_ONLY
+        self.pipeline.put((submission, site_name, site_function, mode))
+        return True
+
+    def sweep_leases(self):
+        """
+        Every lease_sweep_interval, takes over submissions other nodes
+        claimed but never finished, and purges old claims
+        :return: nothing
+        """
+        while not self.stopped.wait(self.lease_sweep_interval):
+            try:
+                for fullname in self.leases.claim_expired():
+                    submission = RedditHandler.get_submission(self.subreddit, fullname)
+                    if not self.queue_submission(submission, claimed=True):
+                        self.leases.complete(fullname)
+                self.leases.purge()
+            except Exception as e:
+                self.logger.error(f'{e.__class__}: {e}')
+
+    def backfill(self, limit: int=None, since: datetime.date=None):
+        """
+        Parses and saves posts already in the subreddits, newest first,
+        without replying.  Posts already in the db are dropped with one
+        query up front, store links are parsed on a pool of
+        backfill_workers and written in bulk.  Store pages only show
+        today's price, so posts from earlier days are saved with their mpn
+        and no price, keeping price history to prices seen on their date
+        :param limit: int, most submissions to walk, None for as many as
+        reddit lists (about 1000)
+        :param since: date, stop at submissions created before this
+        :return: int, number of posts written
+        """
+        self.logger.info(f'backfilling up to {limit} submissions since {since}...')
+        submissions = []
+        for submission in self.subreddit.new(limit=limit):
+            if since is not None and datetime.date.fromtimestamp(submission.created) < since:
+                break
+            submissions.append(submission)
+        submissions = self.drop_written(submissions)
+
+        jobs = []
+        for submission in submissions:
+            site_name, site_function = self.get_site_function(submission.url)
+            if site_function is None:
+                continue
+            if self.config.mode(submission.subreddit.display_name, site_name) is None:
+                continue
+            jobs.append((submission, site_name, site_function, subreddits.DATABASE_ONLY))
+        self.logger.info(f'parsing {len(jobs)} of {len(submissions)} new submissions')
+
+        client.size_pool((self.backfill_workers + 1) * STORE_FANOUT)
+        writer = PostWriter(max_batch=self.backfill_batch)
+        today = datetime.date.today()
+        deferred = 0
+        with ThreadPoolExecutor(self.backfill_workers) as pool:
+            futures = [pool.submit(self.parse, job) for job in jobs]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.logger.error(f'{e.__class__}: {e}')
+                    continue
+                if result is None:
+                    # store breaker open, left for the next backfill
+                    deferred += 1
+                    continue
+                submission, post, markdown = result
+                if post.date < today:
+                    post.price = None
+                writer.add(post)
+        written = writer.flush()
+        self.logger.info(f'backfill done, {len(jobs) - deferred} parsed, '
+                         f'{deferred} skipped by open breakers')
+        return written
+
+    @staticmethod
+    def drop_written(submissions: list, chunk_size: int=10000):
+        """
+        Removes submissions whose fullname is already in the db, with one
+        query per chunk_size submissions
+        :param submissions: list of praw.Reddit.submission
+        :param chunk_size: int, most fullnames per query
+        :return: list of praw.Reddit.submission, not yet written
+        """
+        written = set()
+        fullnames = [submission.fullname for submission in submissions]
+        with session_scope(SessionMode.READ) as session:
+            for i in range(0, len(fullnames), chunk_size):
+                rows = session.query(Post.reddit_fullname)\
+                              .filter(Post.reddit_fullname.in_(fullnames[i:i + chunk_size]))\
+                              .all()
+                written.update(fullname for fullname, in rows)
+        return [submission for submission in submissions
+                if submission.fullname not in written]
+
+    def stop(self):
+        """
+        Lets queued submissions finish every stage, then stops the pipeline,
+        sends pending replies and writes any buffered posts
+        :return: nothing
+        """
+        self.logger.info(f'stopping, queue depths: {self.pipeline.depths()}')
+        self.stopped.set()
+        if self.sweeper is not None:
+            self.sweeper.join()
+            self.sweeper = None
+        self.tracker.stop()
+        self.pipeline.stop()
+        self.replies.stop()
+        self.writer.close()
+
+    def parse(self, job: tuple):
+        """
+        Parse stage, runs the store site function for a submission, see
+        get_details.  While the store's circuit breaker is open the store is
+        not fetched; the claim is released until the breaker lets a probe
+        through, when the lease sweeper picks the submission up again
+        :param job: tuple, submission, site name, site function, and
+        subreddits.REPLY or DATABASE_ONLY
+        :return: tuple, submission, Post and markdown for the reply stage,
+        markdown None if not replying; None if deferred
+        """
+        submission, site_name, site_function, mode = job
+        site_breaker = breaker.get_breaker(site_name)
+        if not site_breaker.allow():
+            delay = site_breaker.retry_in()
+            self.logger.warning(f'{site_name} breaker open, retrying '
+                                f'{submission.fullname} in {delay:.0f}s')
+            self.leases.release(submission.fullname, delay)
+            return None
+        self.logger.info(f'gathering data for {submission.fullname}...')
+        try:
+            with client.track_requests() as tally, \
+                    parse_seconds.time(site=site_name):
+                product_details, markdown = get_details(
+                    submission, site_name, site_function, mode
+                )
+        except Exception:
+            site_breaker.record(False)
+            raise
+        requests_per_submission.observe(tally.count, site=site_name)
+        site_breaker.record(is_parsed(product_details))
+        if product_details is None:
+            product_details = {}
+        post = Post(submission.fullname,
+                    product_details.get('mpn', None),
+                    product_details.get('price', None),
+                    datetime.date.fromtimestamp(submission.created),
+                    site_name)
+        return submission, post, markdown
+
+    def reply(self, job: tuple):
+        """
+        Reply stage, queues a comment on the submission if the store built
+        markdown, and schedules the product for price revisits.  The claim
+        on the submission is completed once the Post is written and the
+        reply, if any, sent
+        :param job: tuple, submission, Post and markdown
+        :return: Post, for the database stage
+        """
+        submission, post, markdown = job
+        if markdown is not None:
+            self.completions.expect(submission.fullname,
+                                    {lease.PendingCompletions.WRITE,
+                                     lease.PendingCompletions.REPLY})
+            self.replies.submit(submission, markdown)
+        else:
+            self.completions.expect(submission.fullname,
+                                    {lease.PendingCompletions.WRITE})
+        if post.price is not None:
+            try:
+                self.tracker.track(submission.fullname, submission.url,
+                                   post.site, post.mpn, post.price)
+            except Exception as e:
+                # the reply is queued, the post must still reach the db
+                self.logger.error(f'{e.__class__}: {e}')
+        return post
+
+    def on_written(self, posts: list):
+        """Called by the writer once posts are committed"""
+        self.completions.done([post.reddit_fullname for post in posts],
+                              lease.PendingCompletions.WRITE)
+
+    def on_reply_finished(self, submission: praw.Reddit.submission, sent: bool):
+        """
+        Called by the reply scheduler once a reply is sent or given up on.
+        Sent replies are recorded on the claim straight away, so a node
+        taking it over before the Post is written does not reply again.
+        Unsent replies leave the claim to expire, so the post is retried
+        """
+        if sent:
+            self.leases.mark_replied(submission.fullname)
+            self.completions.done([submission.fullname],
+                                  lease.PendingCompletions.REPLY)
+        else:
+            self.completions.forget(submission.fullname)
+
+    def is_idle(self):
+        """Returns True if no submissions are waiting at any stage"""
+        return not any(self.pipeline.depths().values())
+
     def has_been_parsed(self, submission: praw.Reddit.submission):
         """
         Determines whether post has already been written to db or has
@@ -70,43 +393,61 @@ class Bot:
         :param submission: praw.Reddit.submission, submission to test against
         :return: bool, True if has been parsed, else False
         """
-        if submission.fullname in FOLLOWED_THIS_SESSION:
-            self.logger.info('post already followed this session')
-            return True
-        elif self.already_replied_to(submission):
-            self.logger.info('post already replied to')
+        if submission.fullname in self.followed:
+            self.logger.info('post already followed')
             return True
         return False
 
-    def already_replied_to(self, submission: praw.Reddit.submission):
+    def load_followed(self):
         """
-        Checks db for submission.fullname against reddit_fullname
-        :param submission: praw.Reddit.submission, submission to test against
-        :return: bool, true if found in db, else false
+        Builds the dedupe index from the most recent posts in the db
+        :return: DedupeIndex, seeded with reddit_fullnames already written
         """
+        followed = DedupeIndex()
         with session_scope(SessionMode.READ) as session:
-            return session.query(
-                exists().where(Post.reddit_fullname==submission.fullname)
-            ).scalar()
+            rows = session.query(Post.reddit_fullname)\
+                          .order_by(Post.id.desc())\
+                          .limit(followed.max_size)\
+                          .all()
+        followed.update(fullname for fullname, in reversed(rows))
+        self.logger.info(f'loaded {len(followed)} followed posts')
+        return followed
+
+    def load_prices(self):
+        """
+        Fills the price index from every post with an mpn and price, oldest
+        first, so replies can show lowest/last price seen
+        :return: nothing
+        """
+        with session_scope(SessionMode.READ) as session:
+            rows = session.query(Post.mpn, Post.price, Post.site, Post.date)\
+                          .filter(Post.mpn.isnot(None), Post.price.isnot(None))\
+                          .order_by(Post.id)\
+                          .yield_per(10000)
+            price_index.update(rows)
+        self.prices_loaded = True
+        self.logger.info(f'loaded prices for {len(price_index)} mpns')
 
     def get_site_function(self, url: str):
         """
-        Looks for function in site_functions corresponding to url
+        Looks up the store function registered for url's host, importing
+        the store module the first time one of its domains is seen
         :param url: str, link to check for site pattern
         :return: tuple, name of site found and function to call to parse;
         None, None if not found
         """
-        for site, func in self.site_functions.items():
-            if site in url:
-                self.logger.info(f'found {site}')
-                return site, func
+        site, func = registration.get_site_function(url)
+        if func is not None:
+            self.logger.info(f'found {site}')
+            return site, func
         self.logger.warning(f'No func mapped to '
                             f'{url[url.find("//")+2:url.find("//")+22]}')
         return None, None
 
     def save_to_database(self, post: Post):
         """
-        Writes Post model to db via Base @contextmanager
+        Database stage, records the price in the price index and buffers
+        Post model for a batched write to db
         :param post: Post, Post instance to write
         :return: nothing
         """
@@ -114,69 +455,146 @@ class Bot:
             self.logger.debug('skipping write to db, post is None')
             return
         else:
-            with session_scope(SessionMode.WRITE) as session:
-                session.add(post)
-            self.logger.info('written to db')
+            with save_seconds.time():
+                price_index.add(post.mpn, post.price, post.site, post.date)
+                self.writer.add(post)
+            self.logger.info('queued for db')
 
-    @staticmethod
-    def load_stores():
-        """
-        Iterates though /stores and imports all modules.  This process includes
-        registration of store site functions decorated with @register.
-        See /stores/registration.py for details on store registration.
-        :return: nothing
-        """
-        path = './stores'
-        sys.path.insert(0, path)
-        for f in os.listdir(path):
-            fname, ext = os.path.splitext(f)
-            if ext == '.py':
-                __import__(fname)
-        sys.path.pop(0)
+
+def get_details(submission: praw.Reddit.submission,
+                site_name: str,
+                site_function,
+                mode: str):
+    """
+    Runs the store's site function for submissions being replied to.  Posts
+    only saved to db need no more than mpn and price, so the store's recrawl
+    function is run instead when it has one, skipping reply building, ex
+    Microcenter's per store inventory lookups
+    :param submission: praw.Reddit.submission, submission linking to the store
+    :param site_name: str, store domain
+    :param site_function: function, the store's registered site function
+    :param mode: str, subreddits.REPLY or DATABASE_ONLY
+    :return: tuple, product_details dict (or None) and markdown, None if
+    not replying
+    """
+    if mode == subreddits.REPLY:
+        return site_function(submission)
+    details_function = registration.get_recrawl_function(site_name)
+    if details_function is not None:
+        return details_function(submission.url), None
+    product_details, markdown = site_function(submission)
+    return product_details, None
 
 
-def main(sub_to_stream: str):
+def is_parsed(product_details: dict):
     """
-    Starts bot on sub_to_stream, attempts to handle exceptions and restart bot
-    :param sub_to_stream: str, subreddit name ex 'buildapcsales'
+    :param product_details: dict, from a site function, or None
+    :return: bool, True if an mpn or price was found
+    """
+    return (product_details is not None
+            and (product_details.get('mpn') is not None
+                 or product_details.get('price') is not None))
+
+
+def main(subreddit_names: list, config_path: str=SUBREDDITS_CONFIG):
+    """
+    Starts one bot streaming every subreddit in subreddit_names, attempts to
+    handle exceptions and restart bot
+    :param subreddit_names: list of str, subreddit names ex ['buildapcsales']
+    :param config_path: str, path to subreddit config ini
     :return: nothing
     :attr wait_seconds: base to wait on exceptions before restart attempt
     :attr max_uncaught: number of 'unhandled' to catch before exiting
     :attr attempts: starts at 1 to start at first attempt, increases after 'unhandled'
     """
     wrapper_logger = logger.get_logger('Wrapper', './logfile.log')
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
+    if METRICS_FILE is not None:
+        metrics.write_periodically(METRICS_FILE)
     wait_seconds = 60
     max_uncaught = 10
     attempts = 1
-    bot = Bot(sub_to_stream)
-    while attempts <= max_uncaught:
-        wrapper_logger.info(f'starting attempt {attempts}...')
-        try:
-            bot.run()
-        except prawcore.exceptions.ResponseException as e:
-            # network/response error from praw in main loop, okay to restart
-            wait_mins = 5
-            wrapper_logger.error(f'{e.__class__}: e')
-            wrapper_logger.info(f'restarting in {wait_mins} minutes')
-            time.sleep(wait_seconds * wait_mins)
-        except Exception as e:
-            """
-            catch any, wait an increasing amount of time, 
-            restart up to 10 total attempts to mitigate larger or 
-            consistent issues ie network down, reddit broken, etc
-            """
-            wait_time = wait_seconds * attempts * 2
-            wrapper_logger.critical(f'{e.__class__}: e\n'
-                                    f'restarting in {wait_time // 60} minutes')
-            time.sleep(wait_time)
-            attempts += 1
+    price_history.create_tables()
+    lease.create_tables()
+    tracker.create_tables()
+    bot = Bot('+'.join(subreddit_names),
+              config=subreddits.load_config(config_path))
+    try:
+        while attempts <= max_uncaught:
+            wrapper_logger.info(f'starting attempt {attempts}...')
+            try:
+                bot.run()
+            except prawcore.exceptions.ResponseException as e:
+                # network/response error from praw in main loop, okay to restart
+                wait_mins = 5
+                wrapper_logger.error(f'{e.__class__}: e')
+                wrapper_logger.info(f'restarting in {wait_mins} minutes')
+                time.sleep(wait_seconds * wait_mins)
+            except Exception as e:
+                """
+                catch any, wait an increasing amount of time, 
+                restart up to 10 total attempts to mitigate larger or 
+                consistent issues ie network down, reddit broken, etc
+                """
+                wait_time = wait_seconds * attempts * 2
+                wrapper_logger.critical(f'{e.__class__}: e\n'
+                                        f'restarting in {wait_time // 60} minutes')
+                time.sleep(wait_time)
+                attempts += 1
+    finally:
+        # finish anything already parsed before exiting
+        bot.stop()
+
+
+def backfill(subreddit_names: list,
+             limit: int=None,
+             since: datetime.date=None,
+             config_path: str=SUBREDDITS_CONFIG):
+    """
+    Saves past posts from every subreddit in subreddit_names, then exits
+    :param subreddit_names: list of str, subreddit names ex ['buildapcsales']
+    :param limit: int, most submissions to walk, None for no limit
+    :param since: date, earliest submission date to walk back to
+    :param config_path: str, path to subreddit config ini
+    :return: nothing
+    """
+    price_history.create_tables()
+    # backfill never replies and skips posts already written, so takes no claims
+    bot = Bot('+'.join(subreddit_names),
+              config=subreddits.load_config(config_path),
+              leases=lease.NoLeaseBackend())
+    bot.backfill(limit, since)
+
+
+def parse_date(value: str):
+    """Parses a YYYY-MM-DD argument"""
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value} is not a YYYY-MM-DD date')
+
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(description='Stream subreddits for store links')
+    parser.add_argument('subreddits', nargs='*', default=['buildapcsales'],
+                        help='subreddits to stream, default buildapcsales')
+    parser.add_argument('--config', default=SUBREDDITS_CONFIG,
+                        help='per subreddit store config ini')
+    parser.add_argument('--backfill', type=int, metavar='N',
+                        help='save the newest N past posts without replying, then exit; '
+                             '0 for as many as reddit lists')
+    parser.add_argument('--since', type=parse_date, metavar='YYYY-MM-DD',
+                        help='with --backfill, stop at posts older than this')
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        main(sys.argv[1])
+    args = parse_args(sys.argv[1:])
+    if args.backfill is not None or args.since is not None:
+        backfill(args.subreddits, args.backfill or None, args.since, args.config)
     else:
-        main('buildapcsales')
+        main(args.subreddits, args.config)
 
 
 
@@ -0,0 +1,239 @@
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from logger import logger
+
+
+metrics_logger = logger.get_logger('Metrics', './logfile.log')
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# requests, stores, etc
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 15, 20, 25, 30, 40, 50)
+
+
+def format_labels(labels: tuple):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """
+    Base for metrics, holds one value per distinct set of label values
+    :attr name: str, metric name, ex 'bapcs_fetch_seconds'
+    :attr help: str, description shown in the exposition
+    """
+    type = None
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(labels: dict):
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}',
+                 f'# TYPE {self.name} {self.type}']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.extend(self.render_value(labels, value))
+        return lines
+
+    def render_value(self, labels: tuple, value):
+        return [f'{self.name}{format_labels(labels)} {value}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Cumulative histogram, value per label set is [bucket counts, sum, count]
+    :attr buckets: tuple, upper bounds of each bucket
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: tuple=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(
+                key, ([0] * len(self.buckets), 0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent inside it"""
+        return Timer(self, labels)
+
+    def render_value(self, labels: tuple, value):
+        counts, total, count = value
+        lines = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            bucket_labels = labels + (('le', str(bound)),)
+            lines.append(f'{self.name}_bucket{format_labels(bucket_labels)} '
+                         f'{bucket_count}')
+        inf_labels = labels + (('le', '+Inf'),)
+        lines.append(f'{self.name}_bucket{format_labels(inf_labels)} {count}')
+        lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+        lines.append(f'{self.name}_count{format_labels(labels)} {count}')
+        return lines
+
+
+class Timer:
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+"""
+name: Metric, everything rendered by render().  Metrics are registered by
+name, so a module imported twice shares its metrics rather than
+duplicating them
+"""
+registry = {}
+_registry_lock = threading.Lock()
+
+
+def register(metric_class, name: str, *args):
+    with _registry_lock:
+        if name not in registry:
+            registry[name] = metric_class(name, *args)
+        return registry[name]
+
+
+def counter(name: str, help: str):
+    return register(Counter, name, help)
+
+
+def gauge(name: str, help: str):
+    return register(Gauge, name, help)
+
+
+def histogram(name: str, help: str, buckets: tuple=LATENCY_BUCKETS):
+    return register(Histogram, name, help, buckets)
+
+
+def timed(histogram: Histogram, **labels):
+    """
+    Decorator observing each call's duration in histogram
+    :param histogram: Histogram, where durations are recorded
+    :param labels: label values for every observation
+    :return: function decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render():
+    """
+    Renders every metric in Prometheus text exposition format
+    :return: str
+    """
+    with _registry_lock:
+        metrics = sorted(registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    """HTTPServer handling each request on its own thread"""
+    daemon_threads = True
+
+
+def serve(port: int, address: str='127.0.0.1'):
+    """
+    Serves render() over http on a background thread
+    :param port: int, port to listen on
+    :param address: str, interface to listen on, local only by default
+    :return: MetricsServer
+    """
+    server = MetricsServer((address, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever,
+                     name='metrics-server',
+                     daemon=True).start()
+    metrics_logger.info(f'serving metrics on {address}:{port}')
+    return server
+
+
+def write_periodically(path: str, interval: float=15):
+    """
+    Writes render() to path every interval seconds on a background thread.
+    Written to a temp file and renamed, so readers never see a partial file
+    :param path: str, file to write, ex for node_exporter's textfile collector
+    :param interval: float, seconds between writes
+    :return: threading.Thread
+    """
+    def write():
+        while True:
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(render())
+            os.replace(temp_path, path)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=write, name='metrics-writer', daemon=True)
+    thread.start()
+    metrics_logger.info(f'writing metrics to {path}')
+    return thread
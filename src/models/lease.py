@@ -0,0 +1,44 @@
+import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+from database.base import Base
+
+
+class Lease(Base):
+    """
+    Claim on a submission by one bot node, so several nodes streaming the
+    same subreddit split the work and each post is handled once
+    :attr reddit_fullname: str, submission claimed, pk so only one claim
+    can be inserted
+    :attr owner: str, id of the node holding the claim
+    :attr expires: DateTime, utc; after this, if not done, any node may
+    take the claim over
+    :attr attempts: int, times the submission has been claimed
+    :attr done: bool, True once the owner has handled the submission
+    :attr replied: bool, True once a reply to the submission was sent, so
+    a node taking the claim over does not reply again
+    """
+    __tablename__ = 'leases'
+
+    reddit_fullname = Column(String(15), primary_key=True)
+    owner = Column(String(64), nullable=False)
+    expires = Column(DateTime, nullable=False, index=True)
+    attempts = Column(Integer, nullable=False)
+    done = Column(Boolean, nullable=False)
+    replied = Column(Boolean, nullable=False, default=False)
+
+    def __init__(self, reddit_fullname: str, owner: str, expires: datetime.datetime):
+        self.reddit_fullname = reddit_fullname
+        self.owner = owner
+        self.expires = expires
+        self.attempts = 1
+        self.done = False
+        self.replied = False
+
+    def __repr__(self):
+        return f'<Lease ({self.reddit_fullname} - {self.owner} until {self.expires})>'
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,103 @@
+import datetime
+
+from sqlalchemy import Column, Date, Index, Integer, String, UniqueConstraint
+
+from database.base import Base
+
+
+class PriceObservation(Base):
+    """
+    A single price seen for a product, one per parsed post with an mpn and
+    price.  Indexed for history by product and by site
+    :attr id: Integer, generated sql pk
+    :attr reddit_fullname: str, fullname of the post the price came from
+    :attr mpn: str, manufacturer part number
+    :attr site: str, domain the price was seen on ex 'microcenter.com'
+    :attr price: int, rounded price
+    :attr date: Date, date the price was seen
+    """
+    __tablename__ = 'price_observations'
+    __table_args__ = (
+        Index('ix_price_observations_mpn_date', 'mpn', 'date'),
+        Index('ix_price_observations_site_date', 'site', 'date'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    reddit_fullname = Column(String(15))
+    mpn = Column(String(30), nullable=False)
+    site = Column(String(50), nullable=False)
+    price = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+
+    def __init__(self,
+                 reddit_fullname: str,
+                 mpn: str,
+                 site: str,
+                 price: int,
+                 date: datetime.date,
+                 ):
+        self.reddit_fullname = reddit_fullname
+        self.mpn = mpn
+        self.site = site
+        self.price = price
+        self.date = date
+
+    def __repr__(self):
+        return f'<PriceObservation ({self.date} - {self.mpn}, {self.site}: {self.price})>'
+
+
+class DailyPrice(Base):
+    """
+    Rollup of PriceObservations per mpn, site and day, kept up to date as
+    observations are written.  Sum and count are stored rather than the
+    average so a new observation can be folded in without a rescan
+    :attr id: Integer, generated sql pk
+    :attr mpn: str, manufacturer part number
+    :attr site: str, domain ex 'microcenter.com'
+    :attr date: Date, day rolled up
+    :attr min_price: int, lowest price seen that day
+    :attr max_price: int, highest price seen that day
+    :attr price_sum: int, sum of prices seen that day
+    :attr observations: int, number of prices seen that day
+    """
+    __tablename__ = 'daily_prices'
+    __table_args__ = (
+        UniqueConstraint('mpn', 'site', 'date', name='uq_daily_prices_mpn_site_date'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    mpn = Column(String(30), nullable=False)
+    site = Column(String(50), nullable=False)
+    date = Column(Date, nullable=False)
+    min_price = Column(Integer, nullable=False)
+    max_price = Column(Integer, nullable=False)
+    price_sum = Column(Integer, nullable=False)
+    observations = Column(Integer, nullable=False)
+
+    def __init__(self, mpn: str, site: str, date: datetime.date):
+        self.mpn = mpn
+        self.site = site
+        self.date = date
+        self.min_price = None
+        self.max_price = None
+        self.price_sum = 0
+        self.observations = 0
+
+    def add(self, price: int):
+        """Folds a single observed price into the rollup"""
+        self.min_price = price if self.min_price is None else min(self.min_price, price)
+        self.max_price = price if self.max_price is None else max(self.max_price, price)
+        self.price_sum += price
+        self.observations += 1
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.observations if self.observations else None
+
+    def __repr__(self):
+        return (f'<DailyPrice ({self.date} - {self.mpn}, {self.site}: '
+                f'{self.min_price}-{self.max_price})>')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,78 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.orm import validates
+
+from logger import logger
+from database.base import Base
+
+
+class TrackedProduct(Base):
+    """
+    Product page from a post that the price tracker revisits
+    :attr id: Integer, generated sql pk
+    :attr reddit_fullname: str, fullname of the post that linked it
+    :attr url: str, product page
+    :attr site: str, domain ex 'newegg.com'
+    :attr mpn: str, manufacturer part number
+    :attr price: int, last price seen
+    :attr added: DateTime, utc, when first tracked
+    :attr next_crawl: DateTime, utc, when due to be revisited
+    :attr interval: int, seconds between the last two visits
+    :attr failures: int, failed visits in a row
+    """
+    __tablename__ = 'tracked_products'
+
+    id = Column(Integer, primary_key=True)
+    reddit_fullname = Column(String(15))
+    url = Column(String(500), nullable=False)
+    site = Column(String(50), nullable=False)
+    mpn = Column(String(30))
+    price = Column(Integer)
+    added = Column(DateTime, nullable=False, index=True)
+    next_crawl = Column(DateTime, nullable=False)
+    interval = Column(Integer, nullable=False)
+    failures = Column(Integer, nullable=False)
+
+    tracked_logger = logger.get_logger('TrackedProduct', './logfile.log')
+
+    def __init__(self,
+                 reddit_fullname: str,
+                 url: str,
+                 site: str,
+                 mpn: str,
+                 price: int,
+                 added: datetime.datetime,
+                 interval: int,
+                 ):
+        self.reddit_fullname = reddit_fullname
+        self.url = url
+        self.site = site
+        self.mpn = mpn
+        self.price = price
+        self.added = added
+        self.next_crawl = added + datetime.timedelta(seconds=interval)
+        self.interval = interval
+        self.failures = 0
+
+    @validates('mpn', 'site')
+    def validate_lengths(self, key, value):
+        """
+        For attributes in decorator, check against max value len, and truncate if needed
+        :param key: str, each str passed in from decorator
+        :param value: str, passed in by sqlalchemy
+        :return: str, the shorter of value and value[:max len], further handled by sqlalchemy
+        """
+        max_len = getattr(self.__class__, key).prop.columns[0].type.length
+        if value and len(value) > max_len:
+            self.tracked_logger.warning(f'{key}: {value} - '
+                                        f'violated max length and was truncated')
+            return value[:max_len]
+        return value
+
+    def __repr__(self):
+        return f'<TrackedProduct ({self.site} - {self.mpn}, next {self.next_crawl})>'
+
+
+if __name__ == '__main__':
+    pass
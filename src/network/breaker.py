@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+
+from logger import logger
+from metrics import metrics
+
+
+breaker_logger = logger.get_logger('CircuitBreaker', './logfile.log')
+
+# breaker states, values are what the state gauge reports
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+STATE_NAMES = {CLOSED: 'closed', HALF_OPEN: 'half open', OPEN: 'open'}
+
+"""
+A breaker opens once at least MIN_RESULTS of the last WINDOW results are
+in and FAILURE_RATE of them failed.  It stays open COOLDOWN seconds, then
+lets one probe through; a failed probe reopens it for twice as long, up
+to MAX_COOLDOWN
+"""
+WINDOW = 20
+MIN_RESULTS = 5
+FAILURE_RATE = 0.5
+COOLDOWN = 300
+MAX_COOLDOWN = 3600
+# seconds callers turned away while a probe is in flight are told to wait
+PROBE_WAIT = 60
+
+breaker_state = metrics.gauge('bapcs_breaker_state',
+                              'Store circuit breaker state, 0 closed, 1 half open, 2 open')
+breaker_skips = metrics.counter('bapcs_breaker_skips_total',
+                                'Store fetches skipped by an open breaker')
+
+
+class CircuitBreaker:
+    """
+    Tracks recent results for one store, ie fetch errors and parses that
+    found neither mpn nor price, and stops calls to it once too many fail.
+    Closed: every call allowed.  Open: none until cooldown passes.  Half
+    open: a single probe; success closes, failure reopens
+    :attr name: str, store domain
+    :attr window: int, recent results kept
+    :attr min_results: int, results needed before opening
+    :attr failure_rate: float, share of failed results that opens
+    :attr cooldown: float, seconds to stay open the first time
+    :attr max_cooldown: float, most seconds to stay open
+    """
+    def __init__(self,
+                 name: str,
+                 window: int=WINDOW,
+                 min_results: int=MIN_RESULTS,
+                 failure_rate: float=FAILURE_RATE,
+                 cooldown: float=COOLDOWN,
+                 max_cooldown: float=MAX_COOLDOWN,
+                 ):
+        self.name = name
+        self.results = deque(maxlen=window)
+        self.min_results = min_results
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.current_cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+        breaker_state.set(CLOSED, site=name)
+
+    def allow(self):
+        """
+        :return: bool, True if a call to the store may go ahead
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.current_cooldown:
+                    breaker_skips.inc(site=self.name)
+                    return False
+                self.set_state(HALF_OPEN)
+            if self.probing:
+                breaker_skips.inc(site=self.name)
+                return False
+            self.probing = True
+            return True
+
+    def retry_in(self):
+        """
+        :return: float, seconds until an open breaker lets a probe through,
+        PROBE_WAIT while a probe is in flight, 0 if calls may go ahead
+        """
+        with self.lock:
+            if self.state == HALF_OPEN and self.probing:
+                return PROBE_WAIT
+            if self.state != OPEN:
+                return 0
+            return max(0, self.current_cooldown - (time.monotonic() - self.opened_at))
+
+    def record(self, success: bool):
+        """
+        Records the result of an allowed call
+        :param success: bool, False for an error or empty parse
+        :return: nothing
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = False
+                if success:
+                    self.results.clear()
+                    self.current_cooldown = self.cooldown
+                    self.set_state(CLOSED)
+                else:
+                    self.current_cooldown = min(self.max_cooldown, self.current_cooldown * 2)
+                    self.open()
+                return
+            self.results.append(success)
+            failures = self.results.count(False)
+            if (self.state == CLOSED
+                    and len(self.results) >= self.min_results
+                    and failures >= self.failure_rate * len(self.results)):
+                self.open()
+
+    def open(self):
+        self.opened_at = time.monotonic()
+        self.set_state(OPEN)
+
+    def set_state(self, state: int):
+        if state != self.state:
+            breaker_logger.warning(f'{self.name}: {STATE_NAMES[self.state]} -> '
+                                   f'{STATE_NAMES[state]}')
+        self.state = state
+        breaker_state.set(state, site=self.name)
+
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(site: str):
+    """
+    :param site: str, store domain ex 'newegg.com'
+    :return: CircuitBreaker, shared by everything calling site
+    """
+    with breakers_lock:
+        if site not in breakers:
+            breakers[site] = CircuitBreaker(site)
+        return breakers[site]
+
+
+def get_states():
+    """
+    :return: dict, store domain: state name, for every breaker made so far
+    """
+    with breakers_lock:
+        return {site: STATE_NAMES[breaker.state] for site, breaker in breakers.items()}
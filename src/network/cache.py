@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from metrics import metrics
+
+
+"""
+Headers not stored with cached bodies; bodies are stored decoded, so
+the original encoding/length no longer apply
+"""
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding',
+                   'connection', 'set-cookie'}
+
+# ResponseCache counter name: metric it is also counted in
+COUNTERS = {
+    'hits': metrics.counter('bapcs_http_cache_hits_total',
+                            'Store requests answered from a fresh cached page'),
+    'misses': metrics.counter('bapcs_http_cache_misses_total',
+                              'Store requests that downloaded a full page'),
+    'revalidations': metrics.counter('bapcs_http_cache_revalidations_total',
+                                     'Stale cached pages confirmed unchanged by a 304'),
+    'evictions': metrics.counter('bapcs_http_cache_evictions_total',
+                                 'Cached pages dropped to stay under max_bytes'),
+}
+
+
+class CachedResponse:
+    """
+    Cache entry for a single url/request headers combination
+    :attr key: str, cache key
+    :attr url: str, requested url
+    :attr body: bytes, decoded response body
+    :attr headers: dict, response headers
+    :attr encoding: str, text encoding requests used for the body
+    :attr etag: str, ETag header, or None
+    :attr last_modified: str, Last-Modified header, or None
+    :attr stored_at: float, epoch seconds body was last fetched/revalidated
+    """
+    def __init__(self, key: str, url: str, body: bytes, headers: dict,
+                 encoding: str, etag: str, last_modified: str,
+                 stored_at: float):
+        self.key = key
+        self.url = url
+        self.body = body
+        self.headers = headers
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def is_fresh(self, ttl: float):
+        return time.time() - self.stored_at < ttl
+
+    def can_revalidate(self):
+        return self.etag is not None or self.last_modified is not None
+
+    def conditional_headers(self):
+        """Returns headers asking the server to reply 304 if unchanged"""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self):
+        """Rebuilds a requests Response, so callers can't tell a cache hit"""
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = self.body
+        return response
+
+
+class ResponseCache:
+    """
+    On-disk (sqlite) cache of successful GET responses, with least recently
+    used entries evicted once bodies exceed max_bytes in total
+    :attr path: str, sqlite file path
+    :attr max_bytes: int, max total size of stored bodies
+    :attr hits: int, requests answered from a fresh entry
+    :attr misses: int, requests that downloaded a full body
+    :attr revalidations: int, stale entries confirmed unchanged by a 304
+    :attr evictions: int, entries dropped to stay under max_bytes
+    """
+    def __init__(self, path: str, max_bytes: int=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, '
+            'url TEXT NOT NULL, '
+            'body BLOB NOT NULL, '
+            'headers TEXT NOT NULL, '
+            'encoding TEXT, '
+            'etag TEXT, '
+            'last_modified TEXT, '
+            'stored_at REAL NOT NULL, '
+            'accessed_at REAL NOT NULL, '
+            'size INTEGER NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_responses_accessed_at '
+            'ON responses (accessed_at)'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(url: str, headers: dict=None):
+        """
+        Builds key from url and request headers that change the response,
+        ex Microcenter's storeSelected cookie
+        :param url: str, requested url
+        :param headers: dict, request headers
+        :return: str, cache key
+        """
+        headers = headers or {}
+        vary = headers.get('Cookie', '')
+        return hashlib.sha256(f'{url}\n{vary}'.encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        Looks up key, marking it as recently used
+        :param key: str, from make_key
+        :return: CachedResponse; None if not cached
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT key, url, body, headers, encoding, etag, '
+                'last_modified, stored_at FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                (time.time(), key)
+            )
+            self.connection.commit()
+        key, url, body, headers, encoding, etag, last_modified, stored_at = row
+        return CachedResponse(key, url, body, json.loads(headers), encoding,
+                              etag, last_modified, stored_at)
+
+    def store(self, key: str, response: requests.models.Response):
+        """
+        Stores a 200 response body and validators, evicting if over max_bytes
+        :param key: str, from make_key
+        :param response: requests.models.Response, response to store
+        :return: nothing
+        """
+        body = response.content
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in SKIPPED_HEADERS}
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.url, body, json.dumps(headers),
+                 response.encoding, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now, len(body))
+            )
+            self.evict()
+            self.connection.commit()
+
+    def refresh(self, key: str):
+        """Marks key's body as current after a 304 revalidation"""
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'UPDATE responses SET stored_at = ?, accessed_at = ? '
+                'WHERE key = ?',
+                (now, now, key)
+            )
+            self.connection.commit()
+
+    def evict(self):
+        """Drops least recently used entries until under max_bytes"""
+        total, = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()
+        rows = self.connection.execute(
+            'SELECT key, size FROM responses ORDER BY accessed_at'
+        )
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany('DELETE FROM responses WHERE key = ?',
+                                    evicted)
+        if evicted:
+            self.evictions += len(evicted)
+            COUNTERS['evictions'].inc(len(evicted))
+
+    def count(self, counter: str):
+        """
+        Increments counter, one of 'hits', 'misses' or 'revalidations', and
+        its bapcs_http_cache_ metric
+        """
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        COUNTERS[counter].inc()
+
+    def stats(self):
+        """
+        Returns cache counters
+        :return: dict, hits, misses, revalidations, evictions and entry count
+        """
+        with self.lock:
+            entries, = self.connection.execute(
+                'SELECT COUNT(*) FROM responses'
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
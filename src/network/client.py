@@ -0,0 +1,388 @@
+import codecs
+import functools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from logger import logger
+from metrics import metrics
+from network.cache import ResponseCache
+
+
+client_logger = logger.get_logger('Client', './logfile.log')
+
+# seconds to establish a connection, seconds to wait between bytes received
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+# number of hosts to keep pools for, and connections kept per host
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+"""
+gzip/deflate always, plus br when brotli is installed; urllib3 only
+advertises encodings it is able to decode
+"""
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+# on-disk response cache location and size limit
+CACHE_PATH = './cache/responses.sqlite'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# bytes read per iteration when streaming a page
+CHUNK_SIZE = 16 * 1024
+
+_session = None
+_cache = None
+
+"""
+Per host totals for get_until: requests, requests stopped before the end
+of the body, bytes read, bytes skipped and early stops whose skipped bytes
+are unknown.  Skipped bytes come from Content-Length, or else are estimated
+from the last full body read from the same domain, see full_sizes
+"""
+stream_stats = {}
+_stream_stats_lock = threading.Lock()
+# domain: wire bytes of the last full 200 body read from it
+full_sizes = {}
+
+fetch_seconds = metrics.histogram('bapcs_fetch_seconds',
+                                  'Store page fetch latency by domain')
+fetch_bytes = metrics.counter('bapcs_fetch_wire_bytes_total',
+                              'Bytes received from stores, before decompression, by domain')
+fetch_requests = metrics.counter('bapcs_fetch_requests_total',
+                                 'Requests made to stores by domain and status')
+stream_requests = metrics.counter('bapcs_stream_requests_total',
+                                  'Partial page reads by domain and whether they stopped early')
+stream_bytes_read = metrics.counter('bapcs_stream_wire_bytes_read_total',
+                                    'Bytes received by partial page reads, before decompression, by domain')
+stream_bytes_saved = metrics.counter('bapcs_stream_wire_bytes_saved_total',
+                                     'Bytes not read by stopping early, by domain and basis: '
+                                     'content-length, or estimate from the last full read')
+stream_saved_unknown = metrics.counter('bapcs_stream_saved_unknown_total',
+                                       'Early stops with no Content-Length or full read '
+                                       'to measure bytes saved against, by domain')
+
+_local = threading.local()
+
+
+class RequestTally:
+    """Counts requests made while tracking, see track_requests"""
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self):
+        with self.lock:
+            self.count += 1
+
+
+@contextmanager
+def track_requests():
+    """
+    Counts requests made by the current thread while inside, and by
+    functions it hands to other threads wrapped with propagate()
+    :return: RequestTally, count of requests made
+    """
+    previous = getattr(_local, 'tally', None)
+    _local.tally = RequestTally()
+    try:
+        yield _local.tally
+    finally:
+        _local.tally = previous
+
+
+def propagate(function):
+    """
+    Wraps function so requests it makes from another thread, ex a
+    ThreadPoolExecutor worker, count toward the caller's track_requests
+    :param function: function to wrap
+    :return: function
+    """
+    tally = getattr(_local, 'tally', None)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, 'tally', None)
+        _local.tally = tally
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.tally = previous
+    return wrapper
+
+
+def get_domain(url: str):
+    """Returns url's hostname without a leading 'www.'"""
+    host = urlsplit(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def record_request(url: str, status_code: int, seconds: float, size: int):
+    """
+    Records a completed store request in metrics and the current tally
+    :param url: str, requested url
+    :param status_code: int, response status
+    :param seconds: float, time from request to body read
+    :param size: int, bytes read off the connection, before decompression
+    :return: nothing
+    """
+    domain = get_domain(url)
+    fetch_seconds.observe(seconds, domain=domain)
+    fetch_bytes.inc(size, domain=domain)
+    fetch_requests.inc(domain=domain, status=status_code)
+    tally = getattr(_local, 'tally', None)
+    if tally is not None:
+        tally.add()
+
+
+def get_session():
+    """
+    Returns the shared requests.Session, creating it on first use.  Keeps a
+    connection pool per host, so repeated requests to a store reuse
+    connections instead of paying a new TCP/TLS handshake each time
+    :return: requests.Session
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        mount_adapter(session)
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        _session = session
+    return _session
+
+
+def mount_adapter(session: requests.Session):
+    """Mounts an HTTPAdapter pooling POOL_MAXSIZE connections per host on session"""
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                          pool_maxsize=POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+
+def size_pool(concurrency: int):
+    """
+    Keeps at least concurrency connections per host, so that many requests
+    to one store at once, ex parse workers times Microcenter's store fan-out,
+    are all returned to the pool instead of discarded when done.  Replaces
+    the adapter if the session already exists, its open connections are
+    closed
+    :param concurrency: int, most requests made to one host at once
+    :return: nothing
+    """
+    global POOL_MAXSIZE
+    if concurrency <= POOL_MAXSIZE:
+        return
+    POOL_MAXSIZE = concurrency
+    if _session is not None:
+        old_adapter = _session.get_adapter('https://')
+        mount_adapter(_session)
+        old_adapter.close()
+    client_logger.info(f'keeping up to {POOL_MAXSIZE} connections per host')
+
+
+def get_cache():
+    """
+    Returns the shared ResponseCache, creating it on first use
+    :return: ResponseCache
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(CACHE_PATH, CACHE_MAX_BYTES)
+    return _cache
+
+
+def get(url: str, headers: dict=None, timeout=None, ttl: float=None):
+    """
+    GET url through the shared session.  If ttl is given, responses are
+    cached on disk: entries younger than ttl are returned without a request,
+    older entries are revalidated with If-None-Match/If-Modified-Since
+    :param url: str, url to request
+    :param headers: dict, additional request headers
+    :param timeout: float or tuple, overrides (connect, read) timeouts
+    :param ttl: float, seconds a cached response is used without revalidating,
+    None to bypass the cache
+    :return: requests.models.Response
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if ttl is None:
+        return fetch(url, headers, timeout)
+
+    cache = get_cache()
+    key = cache.make_key(url, headers)
+    cached = cache.get(key)
+    if cached is not None and cached.is_fresh(ttl):
+        cache.count('hits')
+        return cached.to_response()
+
+    request_headers = dict(headers or {})
+    if cached is not None:
+        request_headers.update(cached.conditional_headers())
+    response = fetch(url, request_headers, timeout)
+
+    if response.status_code == 304 and cached is not None:
+        cache.count('revalidations')
+        cache.refresh(key)
+        return cached.to_response()
+    cache.count('misses')
+    if response.status_code == 200:
+        cache.store(key, response)
+    return response
+
+
+def fetch(url: str, headers: dict, timeout):
+    """GET url through the shared session, recording it in metrics"""
+    start = time.perf_counter()
+    response = get_session().get(url, headers=headers, timeout=timeout,
+                                 stream=True)
+    # reads and decodes the whole body, raw counts what came off the wire
+    response.content
+    wire_bytes = response.raw.tell()
+    record_request(url, response.status_code, time.perf_counter() - start,
+                   wire_bytes)
+    if response.status_code == 200:
+        full_sizes[get_domain(url)] = wire_bytes
+    return response
+
+
+def get_until(url: str, anchors: list, headers: dict=None, timeout=None,
+              ttl: float=None):
+    """
+    GET url, reading the body in chunks and closing the connection as soon
+    as every anchor pattern matches the text read so far.  For parsers that
+    only need data near the top of a page.  A fresh cached copy is used if
+    ttl is given, but partial bodies are never cached
+    :param url: str, url to request
+    :param anchors: list of str, regex patterns that must all match before
+    reading stops, ex r'inventory = [^\n]*\n'
+    :param headers: dict, additional request headers
+    :param timeout: float or tuple, overrides (connect, read) timeouts
+    :param ttl: float, seconds a cached response is used, None to skip cache
+    :return: requests.models.Response, content holds only what was read
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if ttl is not None:
+        cache = get_cache()
+        cached = cache.get(cache.make_key(url, headers))
+        if cached is not None and cached.is_fresh(ttl):
+            cache.count('hits')
+            return cached.to_response()
+
+    start = time.perf_counter()
+    response = get_session().get(url, headers=headers, timeout=timeout,
+                                 stream=True)
+    patterns = [re.compile(anchor) for anchor in anchors]
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(
+        errors='replace'
+    )
+    chunks = []
+    text = ''
+    stopped_early = False
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            text += decoder.decode(chunk)
+            patterns = [pattern for pattern in patterns
+                        if pattern.search(text) is None]
+            if not patterns:
+                stopped_early = True
+                break
+        wire_bytes = response.raw.tell()
+    finally:
+        response.close()
+
+    response._content = b''.join(chunks)
+    response._content_consumed = True
+    record_request(url, response.status_code, time.perf_counter() - start,
+                   wire_bytes)
+    if ttl is not None:
+        cache.count('misses')
+        if not stopped_early and response.status_code == 200:
+            cache.store(cache.make_key(url, headers), response)
+    record_stream(url, response, stopped_early, wire_bytes)
+    return response
+
+
+def record_stream(url: str, response, stopped_early: bool, wire_bytes: int):
+    """
+    Adds a get_until result to stream_stats and metrics, and logs bytes
+    saved.  Without Content-Length, ie chunked pages, bytes saved are
+    estimated against the last full read from the same domain, and are
+    unknown if there has been none
+    :param url: str, requested url
+    :param response: requests.models.Response, streamed response
+    :param stopped_early: bool, True if the body was not read to the end
+    :param wire_bytes: int, bytes read off the connection (pre-decompression)
+    :return: nothing
+    """
+    host = urlsplit(url).hostname
+    domain = get_domain(url)
+    length = response.headers.get('Content-Length')
+    saved, basis = 0, None
+    if not stopped_early:
+        if response.status_code == 200:
+            full_sizes[domain] = wire_bytes
+    elif length is not None:
+        saved, basis = max(0, int(length) - wire_bytes), 'content-length'
+    elif domain in full_sizes:
+        saved, basis = max(0, full_sizes[domain] - wire_bytes), 'estimate'
+    unknown = stopped_early and basis is None
+    with _stream_stats_lock:
+        stats = stream_stats.setdefault(host, {
+            'requests': 0,
+            'stopped_early': 0,
+            'bytes_read': 0,
+            'bytes_saved': 0,
+            'saved_unknown': 0,
+        })
+        stats['requests'] += 1
+        stats['stopped_early'] += int(stopped_early)
+        stats['bytes_read'] += wire_bytes
+        stats['bytes_saved'] += saved
+        stats['saved_unknown'] += int(unknown)
+    stream_requests.inc(domain=domain, stopped_early=str(stopped_early).lower())
+    stream_bytes_read.inc(wire_bytes, domain=domain)
+    if basis is not None:
+        stream_bytes_saved.inc(saved, domain=domain, basis=basis)
+    if unknown:
+        stream_saved_unknown.inc(domain=domain)
+        client_logger.info(f'{host}: read {wire_bytes} bytes, saved unknown')
+    else:
+        client_logger.info(f'{host}: read {wire_bytes} bytes, saved {saved}')
+
+
+def open_connection(host: str):
+    """
+    Opens a pooled connection to host by making a HEAD request
+    :param host: str, host to connect to, ex 'www.newegg.com'
+    :return: nothing
+    """
+    try:
+        get_session().head(f'https://{host}/',
+                           timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    except requests.exceptions.RequestException as e:
+        client_logger.error(f'{e.__class__}: {host}: {e}')
+    else:
+        client_logger.info(f'connected to {host}')
+
+
+def warm_up(sites):
+    """
+    Opens connections to each store site concurrently so the first
+    submission for each store does not pay for connection setup
+    :param sites: iterable of str, store domains, ex 'newegg.com'
+    :return: nothing
+    """
+    hosts = [f'www.{site}' for site in sites]
+    if not hosts:
+        return
+    with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+        list(executor.map(open_connection, hosts))
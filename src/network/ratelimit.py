@@ -0,0 +1,92 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.  Tokens refill at rate per second up to
+    capacity; each acquire takes one.  pause() empties the bucket and holds
+    off refills, for when the far end says to back off
+    :attr rate: float, tokens added per second, float('inf') for no limit
+    :attr capacity: float, most tokens held, ie the largest burst
+    """
+    def __init__(self, rate: float, capacity: float=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now: float):
+        if now < self.paused_until:
+            self.updated = now
+            return
+        elapsed = now - max(self.updated, self.paused_until)
+        if self.rate == float('inf'):
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """
+        :return: float, seconds until a token is available, 0 if one is now
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now + self.refill_time(1)
+            return self.refill_time(1 - self.tokens)
+
+    def refill_time(self, tokens: float):
+        if tokens <= 0 or self.rate == float('inf'):
+            return 0
+        if self.rate <= 0:
+            return float('inf')
+        return tokens / self.rate
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available, without waiting
+        :return: bool, True if a token was taken
+        """
+        with self.lock:
+            self.refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float=None):
+        """
+        Waits for and takes a token
+        :param timeout: float, most seconds to wait, None to wait forever
+        :return: bool, True if a token was taken before timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            wait = self.delay()
+            if deadline is not None:
+                if time.monotonic() + wait > deadline:
+                    return False
+            time.sleep(wait)
+        return True
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            self.refill(time.monotonic())
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """
+        Empties the bucket and adds no tokens for seconds
+        :param seconds: float, seconds to hold off
+        :return: nothing
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = 0
+            self.updated = now
+            self.paused_until = max(self.paused_until, now + seconds)
@@ -0,0 +1,117 @@
+import queue
+import threading
+
+from logger import logger
+from metrics import metrics
+
+
+pipeline_logger = logger.get_logger('Pipeline', './logfile.log')
+
+queue_depth = metrics.gauge('bapcs_queue_depth',
+                            'Items waiting at each pipeline stage')
+
+"""
+Placed on a stage's queue once per worker to shut the stage down after
+everything queued ahead of it has been handled
+"""
+STOP = object()
+
+
+class Stage:
+    """
+    A pool of worker threads draining a bounded queue.  Each item taken off
+    the queue is passed to handler; anything other than None returned by
+    handler is put on the next stage's queue.  A full queue blocks put(),
+    which applies backpressure to the stage feeding it
+    :attr name: str, stage name used for thread names and logging
+    :attr handler: function, called with each queued item
+    :attr workers: int, number of worker threads
+    :attr queue: queue.Queue, bounded input queue
+    :attr output: Stage, stage handler results are passed to, or None
+    """
+    def __init__(self, name: str, handler, workers: int=1, maxsize: int=100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.output = None
+        self.threads = []
+
+    def start(self):
+        """Starts worker threads, if not already running"""
+        if self.threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work,
+                                      name=f'{self.name}-{i}',
+                                      daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """
+        Lets workers finish everything already queued, then joins them
+        :return: nothing
+        """
+        for _ in self.threads:
+            self.queue.put(STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def put(self, item):
+        """Queues item, blocking while the queue is full"""
+        self.queue.put(item)
+        queue_depth.set(self.depth(), stage=self.name)
+
+    def depth(self):
+        """Returns approximate number of items waiting in the queue"""
+        return self.queue.qsize()
+
+    def work(self):
+        """Worker loop, runs until STOP is taken off the queue"""
+        while True:
+            item = self.queue.get()
+            queue_depth.set(self.depth(), stage=self.name)
+            try:
+                if item is STOP:
+                    return
+                result = self.handler(item)
+                if result is not None and self.output is not None:
+                    self.output.put(result)
+            except Exception as e:
+                # one bad item should not take the worker down with it
+                pipeline_logger.error(f'{self.name}: {e.__class__}: {e}')
+            finally:
+                self.queue.task_done()
+
+
+class Pipeline:
+    """
+    Stages connected in order; each stage's results feed the next
+    :attr stages: list of Stage
+    """
+    def __init__(self, stages: list):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.output = next_stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        """Stops stages in order, so each drains into the next before it stops"""
+        for stage in self.stages:
+            stage.stop()
+
+    def put(self, item):
+        """Queues item on the first stage"""
+        self.stages[0].put(item)
+
+    def depths(self):
+        """
+        Returns current queue depth of each stage
+        :return: dict, stage name: depth
+        """
+        return {stage.name: stage.depth() for stage in self.stages}
@@ -1,12 +1,14 @@
-import time
-
 import praw
 
 from logger import logger
+from metrics import metrics
 
 
 logger = logger.get_logger('RedditHandler', './logfile.log')
 
+reply_seconds = metrics.histogram('bapcs_reply_seconds',
+                                  'Time to post a reply comment')
+
 
 class RedditHandler:
 
@@ -16,29 +18,52 @@ class RedditHandler:
         subreddit = reddit.subreddit(sub_to_init)
         return subreddit
 
+    @staticmethod
+    def get_submission(subreddit: praw.models.Subreddit, fullname: str):
+        """
+        :param subreddit: praw.models.Subreddit, any, for its reddit instance
+        :param fullname: str, ex 't3_a4hafgh'
+        :return: praw.Reddit.submission, lazily fetched
+        """
+        return subreddit._reddit.submission(id=fullname.split('_', 1)[-1])
+
     @staticmethod
     def reply_to_submission(submission: praw.Reddit.submission, markdown: str):
         """
-        Attempts to post comment to reddit submission; sleeps
-        and retries if ratelimit enforced by reddit
+        Attempts to post comment to reddit submission.  Does not wait or
+        retry if ratelimit enforced by reddit, see reddit.scheduler
         :param submission: praw.Reddit.submission, submission to reply to
         :param markdown: str, formatted markdown for reddit
-        :return: nothing
+        :return: int, seconds to wait before retrying if rate limited; else None
         """
-        if markdown is not None:
-            logger.info('attempting reply...')
-            try:
+        if markdown is None:
+            logger.debug('skipping reply, markdown is None')
+            return None
+        logger.info('attempting reply...')
+        try:
+            with reply_seconds.time():
                 submission.reply(markdown)
-            except praw.exceptions.APIException as e:
-                logger.error(e.message)
-                if e.error_type == 'RATELIMIT':
-                    wait_mins = RedditHandler.get_ratelimit(e.message) * 60
-                    logger.info(f'Waiting {wait_mins} mins, then resubmitting...')
-                    time.sleep(wait_mins)
-                    RedditHandler.reply_to_submission(submission, markdown)
-            else:
-                logger.info('replied')
-        logger.debug('skipping reply, markdown is None')
+        except praw.exceptions.APIException as e:
+            logger.error(e.message)
+            if e.error_type == 'RATELIMIT':
+                return RedditHandler.get_ratelimit(e.message) * 60
+        else:
+            logger.info('replied')
+        return None
+
+    @staticmethod
+    def get_limits(submission: praw.Reddit.submission):
+        """
+        Request quota from reddit's X-Ratelimit headers on the last response,
+        as tracked by praw
+        :param submission: praw.Reddit.submission, submission replied to
+        :return: dict, 'remaining', 'reset_timestamp' and 'used'; None if
+        submission has no reddit instance
+        """
+        reddit = getattr(submission, '_reddit', None)
+        if reddit is None:
+            return None
+        return reddit.auth.limits
 
     @staticmethod
     def get_ratelimit(message: str):
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import OrderedDict
+
+from logger import logger
+from metrics import metrics
+from network.ratelimit import TokenBucket
+
+
+scheduler_logger = logger.get_logger('ReplyScheduler', './logfile.log')
+
+replies_queued = metrics.gauge('bapcs_replies_queued',
+                               'Replies waiting to be sent')
+replies_dropped = metrics.counter('bapcs_replies_dropped_total',
+                                  'Replies not sent by reason')
+reply_delay = metrics.gauge('bapcs_reply_delay_seconds',
+                            'Current least time between replies')
+
+
+class ReplyScheduler:
+    """
+    Queue of pending replies drained by a background thread at the rate a
+    TokenBucket allows, so rate limits never hold up parsing.  The rate is
+    learned: every RATELIMIT halves it and pauses sending for as long as
+    reddit asks, each successful reply raises it again by min_rate, and it
+    is also capped by the request quota reddit reports in its headers.
+    A second reply queued for the same submission replaces the first;
+    replies that have waited max_age are dropped
+    :attr reply_function: callable(submission, markdown), returns seconds to
+    wait if rate limited, else None
+    :attr limits_function: callable(submission), returns dict with
+    'remaining' and 'reset_timestamp' from reddit headers, or None
+    :attr on_finished: callable(submission, sent), called once a reply is
+    sent (sent True), or dropped or failed (sent False)
+    :attr max_rate: float, replies per second when never limited
+    :attr min_rate: float, lowest rate backed off to
+    :attr max_age: float, seconds a reply may wait before it is dropped
+    """
+    def __init__(self,
+                 reply_function,
+                 limits_function=None,
+                 max_rate: float=0.1,
+                 min_rate: float=1 / 600,
+                 max_age: float=900,
+                 on_finished=None,
+                 ):
+        self.reply_function = reply_function
+        self.limits_function = limits_function
+        self.on_finished = on_finished
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.max_age = max_age
+        self.learned_rate = max_rate
+        self.quota_rate = float('inf')
+        self.bucket = TokenBucket(max_rate)
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.deadline = None
+        self.thread = None
+        reply_delay.set(self.delay())
+
+    def start(self):
+        """Starts the background thread that sends replies"""
+        if self.thread is not None:
+            return
+        self.stopping = False
+        self.deadline = None
+        self.thread = threading.Thread(target=self.drain,
+                                       name='reply-scheduler',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float=60):
+        """
+        Sends what is pending, for up to timeout seconds, then stops the
+        background thread.  Replies still pending after that are dropped
+        :param timeout: float, most seconds to keep sending
+        :return: nothing
+        """
+        with self.condition:
+            self.stopping = True
+            self.deadline = time.monotonic() + timeout
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        with self.condition:
+            dropped = [submission for submission, _, _ in self.pending.values()]
+            self.pending.clear()
+            replies_queued.set(0)
+        if dropped:
+            scheduler_logger.warning(f'dropped {len(dropped)} replies on stop')
+            replies_dropped.inc(len(dropped), reason='stopped')
+        for submission in dropped:
+            self.finished(submission, False)
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def submit(self, submission, markdown: str):
+        """
+        Queues a reply, replacing any still pending for the same submission
+        :param submission: praw.Reddit.submission, submission to reply to
+        :param markdown: str, formatted markdown for reddit
+        :return: nothing
+        """
+        with self.condition:
+            entry = self.pending.get(submission.fullname)
+            if entry is not None:
+                replies_dropped.inc(reason='merged')
+                self.pending[submission.fullname] = (submission, markdown, entry[2])
+            else:
+                self.pending[submission.fullname] = (submission, markdown, time.monotonic())
+            replies_queued.set(len(self.pending))
+            self.condition.notify()
+
+    def next_reply(self):
+        """
+        Waits until a reply is pending and the bucket has a token
+        :return: tuple, submission, markdown and time queued; None once
+        stopping and nothing can be sent before the deadline
+        """
+        with self.condition:
+            while True:
+                self.expire()
+                now = time.monotonic()
+                if self.stopping and (not self.pending or now >= self.deadline):
+                    return None
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                wait = self.bucket.delay()
+                if self.stopping:
+                    wait = min(wait, self.deadline - now)
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                if self.bucket.try_acquire():
+                    fullname, entry = self.pending.popitem(last=False)
+                    replies_queued.set(len(self.pending))
+                    return entry
+
+    def expire(self):
+        now = time.monotonic()
+        expired = [fullname for fullname, (_, _, queued) in self.pending.items()
+                   if now - queued >= self.max_age]
+        for fullname in expired:
+            scheduler_logger.warning(f'dropping reply to {fullname}, waited over {self.max_age}s')
+            submission, _, _ = self.pending.pop(fullname)
+            self.finished(submission, False)
+        if expired:
+            replies_dropped.inc(len(expired), reason='expired')
+            replies_queued.set(len(self.pending))
+
+    def drain(self):
+        while True:
+            entry = self.next_reply()
+            if entry is None:
+                return
+            submission, markdown, queued = entry
+            try:
+                wait = self.reply_function(submission, markdown)
+            except Exception as e:
+                scheduler_logger.error(f'{e.__class__}: {e}')
+                self.finished(submission, False)
+                continue
+            if wait is not None:
+                self.requeue(submission, markdown, queued)
+                self.on_ratelimit(wait)
+            else:
+                self.on_success()
+                self.finished(submission, True)
+            if self.limits_function is not None:
+                self.on_limits(self.limits_function(submission))
+
+    def finished(self, submission, sent: bool):
+        if self.on_finished is None:
+            return
+        try:
+            self.on_finished(submission, sent)
+        except Exception as e:
+            scheduler_logger.error(f'{e.__class__}: {e}')
+
+    def requeue(self, submission, markdown: str, queued: float):
+        """Puts a rate limited reply back at the front of the queue"""
+        with self.condition:
+            if submission.fullname not in self.pending:
+                self.pending[submission.fullname] = (submission, markdown, queued)
+                self.pending.move_to_end(submission.fullname, last=False)
+                replies_queued.set(len(self.pending))
+
+    def on_ratelimit(self, wait: float):
+        """
+        Pauses sending for wait seconds and halves the learned rate
+        :param wait: float, seconds reddit asked us to wait
+        :return: nothing
+        """
+        self.bucket.pause(wait)
+        self.learned_rate = max(self.min_rate, self.learned_rate / 2)
+        self.update_rate()
+        reply_delay.set(max(wait, self.delay()))
+        scheduler_logger.info(f'rate limited, pausing {wait}s, '
+                              f'rate now {self.bucket.rate:.4f}/s')
+
+    def on_success(self):
+        self.learned_rate = min(self.max_rate, self.learned_rate + self.min_rate)
+        self.update_rate()
+
+    def on_limits(self, limits: dict):
+        """
+        Caps the rate so the remaining request quota lasts until it resets
+        :param limits: dict, 'remaining' and 'reset_timestamp' (epoch
+        seconds) as praw reports them from reddit's headers, or None
+        :return: nothing
+        """
+        if not limits or limits.get('remaining') is None or not limits.get('reset_timestamp'):
+            return
+        reset_in = max(1.0, limits['reset_timestamp'] - time.time())
+        self.quota_rate = max(self.min_rate, limits['remaining'] / reset_in)
+        self.update_rate()
+
+    def update_rate(self):
+        self.bucket.set_rate(min(self.learned_rate, self.quota_rate))
+        reply_delay.set(self.delay())
+        with self.condition:
+            self.condition.notify()
+
+    def delay(self):
+        """
+        :return: float, seconds between replies at the current rate
+        """
+        rate = self.bucket.rate
+        return 0 if rate == float('inf') else 1 / rate
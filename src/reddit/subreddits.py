@@ -0,0 +1,100 @@
+import configparser
+
+from logger import logger
+
+
+subreddits_logger = logger.get_logger('Subreddits', './logfile.log')
+
+# what to do with a store link found in a subreddit
+REPLY = 'reply'
+DATABASE_ONLY = 'database only'
+
+# config value matching every store
+ALL = 'all'
+# section holding settings for subreddits without their own
+DEFAULT = 'DEFAULT'
+
+
+class SubredditConfig:
+    """
+    Per subreddit store settings, see examples/subreddits.ini.  Each section
+    names a subreddit and lists the stores to reply for and the stores to
+    only save to db; stores in neither are skipped.  Subreddits without a
+    section use DEFAULT, and with no DEFAULT every store is replied for.
+    A section setting only DatabaseOnly replies for nothing, rather than
+    inheriting DEFAULT's Reply, which would win over it; a section setting
+    only Reply inherits DEFAULT's DatabaseOnly
+    :attr default: tuple, (reply stores, db only stores) for DEFAULT
+    :attr sections: dict, lowercase subreddit name: (reply stores, db only
+    stores), each a set of domains or ALL
+    """
+    def __init__(self, parser: configparser.ConfigParser):
+        """
+        :param parser: ConfigParser from make_parser, so sections only hold
+        their own keys
+        """
+        default = parser[DEFAULT] if parser.has_section(DEFAULT) else {}
+        self.default = (self.read_sites(default.get('Reply', ALL)),
+                        self.read_sites(default.get('DatabaseOnly', '')))
+        self.sections = {name.lower(): self.read_section(parser[name], self.default)
+                         for name in parser.sections() if name != DEFAULT}
+
+    @staticmethod
+    def read_section(section: configparser.SectionProxy, default: tuple):
+        """
+        :param section: SectionProxy, one subreddit's own keys
+        :param default: tuple, (reply stores, db only stores) from DEFAULT
+        :return: tuple, (reply stores, db only stores)
+        """
+        reply, database_only = default
+        if 'DatabaseOnly' in section:
+            database_only = SubredditConfig.read_sites(section['DatabaseOnly'])
+            reply = set()
+        if 'Reply' in section:
+            reply = SubredditConfig.read_sites(section['Reply'])
+        return reply, database_only
+
+    @staticmethod
+    def read_sites(value: str):
+        """
+        :param value: str, comma separated domains or 'all'
+        :return: ALL, or set of lowercase domains
+        """
+        if value.strip().lower() == ALL:
+            return ALL
+        return {site.strip().lower() for site in value.split(',') if site.strip()}
+
+    def mode(self, subreddit: str, site: str):
+        """
+        :param subreddit: str, subreddit display name ex 'buildapcsales'
+        :param site: str, registered store domain ex 'microcenter.com'
+        :return: str, REPLY or DATABASE_ONLY; None to skip the link
+        """
+        reply, database_only = self.sections.get(subreddit.lower(), self.default)
+        if reply == ALL or site in reply:
+            return REPLY
+        if database_only == ALL or site in database_only:
+            return DATABASE_ONLY
+        return None
+
+
+def make_parser():
+    """
+    :return: ConfigParser reading [DEFAULT] as a plain section, so other
+    sections do not inherit its keys and SubredditConfig can tell what
+    each section set itself
+    """
+    return configparser.ConfigParser(default_section='\0no defaults')
+
+
+def load_config(config_path: str):
+    """
+    Reads subreddit config from ini file, a missing file replies for every
+    store in every subreddit
+    :param config_path: str, path to ini file
+    :return: SubredditConfig
+    """
+    parser = make_parser()
+    if not parser.read(config_path):
+        subreddits_logger.info(f'{config_path} not found, replying for all stores')
+    return SubredditConfig(parser)
@@ -1,14 +1,17 @@
 import re
 
 from lxml import html
-import requests
 
-from stores.registration import register
+from network import client
+from stores.registration import register, register_recrawl
 from logger import logger
 
 
 amazon_logger = logger.get_logger('Amazon', './logfile.log')
 
+# seconds a cached page is used before revalidating
+CACHE_TTL = 900
+
 
 def get_page(url: str):
     """Simple request based on url"""
@@ -17,7 +20,7 @@ def get_page(url: str):
         'Host': 'www.amazon.com',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
     }
-    return requests.get(url, headers=headers)
+    return client.get(url, headers=headers, ttl=CACHE_TTL)
 
 
 def get_xpath(path: str, tree: html.HtmlElement):
@@ -96,15 +99,14 @@ def get_mpn(text: str):
     return None
 
 
-@register('amazon.com')
-def am_run(submission):
+@register_recrawl('amazon.com')
+def get_product_details(url: str):
     """
-    Given a submission, return product details
-    :param submission: praw.Reddit.submission
+    Given a product url, return product details
+    :param url: str, amazon product url
     :return: dict, product_details
     """
-    # TODO: add markdown
-    page = get_page(submission.url)
+    page = get_page(url)
     text = page.text
     content = page.content
     tree = html.fromstring(content)
@@ -117,6 +119,19 @@ def am_run(submission):
         'price': price,
     }
 
+    return product_details
+
+
+@register('amazon.com')
+def am_run(submission):
+    """
+    Given a submission, return product details
+    :param submission: praw.Reddit.submission
+    :return: dict, product_details
+    """
+    # TODO: add markdown
+    product_details = get_product_details(submission.url)
+
     markdown = None
 
     return product_details, markdown
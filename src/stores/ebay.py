@@ -1,8 +1,8 @@
 import re
-import requests
 
 from lxml import html
 
+from network import client
 from logger import logger
 from stores.registration import register
 from templates import eb_template
@@ -10,6 +10,9 @@ from templates import eb_template
 
 ebay_logger = logger.get_logger('Ebay', './logfile.log')
 
+# seconds a cached page is used before revalidating
+CACHE_TTL = 900
+
 
 def convert_pages_url(url: str):
     """
@@ -39,48 +42,72 @@ def get_page(url: str):
         'DNT': '1',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
     }
-    return requests.get(url, headers=headers)
+    return client.get(url, headers=headers, ttl=CACHE_TTL)
+
 
+"""
+Every id, itemprop and seller feedback attribute on the page, collected in
+one query so each listing field is a dict lookup rather than its own
+search over the document
+"""
+INDEX_PATH = ('//@id | //@itemprop'
+              ' | //@title[contains(., "feedback score: ")]')
 
-def get_xpath(path: str, tree: html.HtmlElement):
+
+def build_index(tree: html.HtmlElement):
     """
-    Looks for path/element in tree
-    :param path: str, valid xpath search string
+    Collects elements needed by the field parsers from tree in one query
     :param tree: html.HtmlElement from lxml
-    :return: element, based on path; or None if not found
+    :return: dict, element id or 'itemprop:' + itemprop -> first element
+    having it, 'feedback score' -> first feedback score title
+    """
+    index = {}
+    for attribute in tree.xpath(INDEX_PATH):
+        if attribute.attrname == 'id':
+            index.setdefault(str(attribute), attribute.getparent())
+        elif attribute.attrname == 'itemprop':
+            index.setdefault(f'itemprop:{attribute}', attribute.getparent())
+        else:
+            index.setdefault('feedback score', str(attribute))
+    return index
+
+
+def get_indexed(key: str, index: dict):
+    """
+    Looks for key in index
+    :param key: str, element id, 'itemprop:mpn' or 'feedback score'
+    :param index: dict, from build_index
+    :return: element or str, based on key; or None if not found
     """
     try:
-        element = tree.xpath(path)[0]
-    except IndexError as e:
+        return index[key]
+    except KeyError as e:
         # attribute doesnt exist = sale splash page/bad link/local pickup, etc
-        ebay_logger.error(f'{e.__class__}: {path}: {e}')
+        ebay_logger.error(f'{e.__class__}: {key}: {e}')
         return None
-    else:
-        return element
 
 
-def get_item_number(tree: html.HtmlElement):
+def get_item_number(index: dict):
     """Returns ebay item number"""
-    path = '//div[@id="descItemNumber"]'
-    number_tag = get_xpath(path, tree)
+    number_tag = get_indexed('descItemNumber', index)
     if number_tag is not None:
         number = number_tag.text
         return number
     return None
 
 
-def get_price(tree: html.HtmlElement):
+def get_price(index: dict):
     """
     Parses price from ebay page
-    :param tree: html.HtmlElement from lxml
+    :param index: dict, from build_index
     :return: int, rounded, if exists; else None
     """
-    paths = [
-        '//span[@id="prcIsum"]',
-        '//span[@id="mm-saleDscPrc"]',
+    keys = [
+        'prcIsum',
+        'mm-saleDscPrc',
     ]
-    for path in paths:
-        price_tag = get_xpath(path, tree)
+    for key in keys:
+        price_tag = get_indexed(key, index)
         try:
             pattern = '[0-9.]*[0-9.]'
             price = re.search(pattern, price_tag.text).group(0).strip()
@@ -96,14 +123,13 @@ def get_price(tree: html.HtmlElement):
     return None
 
 
-def get_seller(tree: html.HtmlElement):
+def get_seller(index: dict):
     """
     Parses ebay seller name from ebay page
-    :param tree: html.HtmlElement from lxml
+    :param index: dict, from build_index
     :return: str, seller name if exists; else None
     """
-    path = '//a[@id="mbgLink"]'
-    seller_tag = get_xpath(path, tree)
+    seller_tag = get_indexed('mbgLink', index)
     if seller_tag is not None:
         seller = seller_tag.get('aria-label')
         seller = seller.split(u'\xa0')[-1]
@@ -111,35 +137,30 @@ def get_seller(tree: html.HtmlElement):
     return None
 
 
-def get_feedback(text: str):
+def get_feedback(index: dict):
     """
     Parses total feedback count from ebay page
-    :param text: str, from requests.get().text
+    :param index: dict, from build_index
     :return: str, total feedback for seller (stars); None if not available
     thousands separated
     """
-    pattern = r'(?s)(?<=feedback score: )(.*?)(?=")'
-    data = re.search(pattern, text)
-    try:
-        feedback = data.group(0).strip()
-    except AttributeError as e:
+    data = get_indexed('feedback score', index)
+    if data is None:
         # Bad link, etc
-        ebay_logger.error(f'{e.__class__}: {e}')
         return None
-    else:
-        feedback = int(feedback)
-        feedback = f'{feedback:,}'
-        return feedback
+    feedback = data.split('feedback score: ', 1)[1].strip()
+    feedback = int(feedback)
+    feedback = f'{feedback:,}'
+    return feedback
 
 
-def get_score(tree: html.HtmlElement):
+def get_score(index: dict):
     """
     Parses % feedback score for seller
-    :param tree: html.HtmlElement from lxml
+    :param index: dict, from build_index
     :return: str, ex '99.2%' - feedback score; None if not available
     """
-    path = '//div[@id="si-fb"]'
-    score_tag = get_xpath(path, tree)
+    score_tag = get_indexed('si-fb', index)
     if score_tag is not None:
         score = score_tag.text
         score = score.split(u'\xa0')[0]
@@ -147,23 +168,18 @@ def get_score(tree: html.HtmlElement):
     return None
 
 
-def get_mpn(text: str):
+def get_mpn(index: dict):
     """
     Parses mpn for product
-    :param text: str, from requests.get().text
+    :param index: dict, from build_index
     :return: str, manuf. product number, if
     entered by seller; else None
     """
-    pattern = r'(?s)(?<=itemprop="mpn">)(.*?)(?=<)'
-    data = re.search(pattern, text)
-    try:
-        mpn = data.group(0).strip()
-    except AttributeError as e:
+    mpn_tag = get_indexed('itemprop:mpn', index)
+    if mpn_tag is None or mpn_tag.text is None:
         # No itemprop="mpn" found = not entered by seller
-        ebay_logger.error(f'{e.__class__}: {e}')
         return None
-    else:
-        return mpn
+    return mpn_tag.text.strip()
 
 
 @register('ebay.com')
@@ -180,17 +196,17 @@ def eb_run(submission):
         return None, None
 
     page = get_page(url)
-    text = page.text
     content = page.content
     tree = html.fromstring(content)
+    index = build_index(tree)
 
     listing_data = {
-        'Seller': get_seller(tree),
-        'Seller Feedback': get_feedback(text),
-        'Seller Score': get_score(tree),
-        'Ebay Item Number': get_item_number(tree),
-        'MPN (probably)': get_mpn(text),
-        'Price': get_price(tree),
+        'Seller': get_seller(index),
+        'Seller Feedback': get_feedback(index),
+        'Seller Score': get_score(index),
+        'Ebay Item Number': get_item_number(index),
+        'MPN (probably)': get_mpn(index),
+        'Price': get_price(index),
     }
 
     product_details = {
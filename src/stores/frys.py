@@ -1,13 +1,15 @@
-import requests
-
 from lxml import html
 
-from stores.registration import register
+from network import client
+from stores.registration import register, register_recrawl
 from logger import logger
 
 
 frys_logger = logger.get_logger('Frys', './logfile.log')
 
+# seconds a cached page is used before revalidating
+CACHE_TTL = 900
+
 
 def get_page(url: str):
     """Simple request based on url"""
@@ -16,7 +18,7 @@ def get_page(url: str):
         'Host': 'www.frys.com',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
     }
-    return requests.get(url, headers=headers)
+    return client.get(url, headers=headers, ttl=CACHE_TTL)
 
 
 def get_price(tree: html.HtmlElement):
@@ -57,15 +59,14 @@ def get_mpn(tree: html.HtmlElement):
         return mpn_tag.text.strip()
 
 
-@register('frys.com')
-def fr_run(submission):
+@register_recrawl('frys.com')
+def get_product_details(url: str):
     """
-    Given a submission, return product details
-    :param submission: praw.Reddit.submission
-    :return: dict, product_details
+    Given a product url, return product details
+    :param url: str, frys product url
+    :return: dict, product_details; None if page could not be parsed
     """
-    # TODO: add markdown
-    page = get_page(submission.url)
+    page = get_page(url)
     content = page.content
 
     try:
@@ -73,7 +74,7 @@ def fr_run(submission):
     except Exception as e:
         # Frys mailer/multiproduct links
         frys_logger.error(f'{e.__class__}: {e}')
-        return None, None
+        return None
 
     price = get_price(tree)
     mpn = get_mpn(tree)
@@ -83,6 +84,19 @@ def fr_run(submission):
         'price': price,
     }
 
+    return product_details
+
+
+@register('frys.com')
+def fr_run(submission):
+    """
+    Given a submission, return product details
+    :param submission: praw.Reddit.submission
+    :return: dict, product_details
+    """
+    # TODO: add markdown
+    product_details = get_product_details(submission.url)
+
     markdown = None
 
     return product_details, markdown
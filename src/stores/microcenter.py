@@ -1,16 +1,118 @@
 import json
 import re
 import requests
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor, wait
 from lxml import html
 
-from stores.registration import register
+from metrics import metrics
+from network import client
+from stores.registration import register, register_recrawl
 from templates import mc_template
 from logger import logger
 
 
 mc_logger = logger.get_logger('Microcenter', './logfile.log')
 
+# max concurrent store page requests per product
+MAX_WORKERS = 8
+# seconds before a single store page request is abandoned
+REQUEST_TIMEOUT = 10
+# seconds all store lookups for one product may take, stores not back by then are unknown
+STORE_DATA_TIMEOUT = 15
+# inventory shown for stores that missed STORE_DATA_TIMEOUT
+UNKNOWN_INVENTORY = 'Unknown'
+# seconds a cached page is used before revalidating, inventory changes often
+CACHE_TTL = 120
+# seconds a store's inventory is reused as-is, then reused while refreshing
+INVENTORY_TTL = 180
+INVENTORY_STALE_TTL = 900
+# product page is only read until get_metadata and get_stores can be answered
+PAGE_ANCHORS = [
+    r'(?s)dataLayer = \[.*?\];',
+    r'inventory = [^\n]*\n',
+]
+
+
+class InventoryCache:
+    """
+    Parsed inventory lines keyed by (product id, store number).  Lines
+    younger than ttl are fresh; lines younger than stale_ttl may still be
+    used, but should be refreshed in the background
+    :attr ttl: float, seconds a line is fresh
+    :attr stale_ttl: float, seconds a line is usable at all
+    """
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISSING = 'missing'
+
+    def __init__(self, ttl: float, stale_ttl: float):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """
+        Looks up key
+        :param key: tuple, product id, store number
+        :return: tuple, cached line (may be None) and FRESH, STALE or MISSING
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None, self.MISSING
+        fetched_at, line = entry
+        age = time.monotonic() - fetched_at
+        if age < self.ttl:
+            return line, self.FRESH
+        if age < self.stale_ttl:
+            return line, self.STALE
+        return None, self.MISSING
+
+    def put(self, key: tuple, line):
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = (now, line)
+            self.refreshing.discard(key)
+            expired = [cached for cached, (fetched_at, _) in self.entries.items()
+                       if now - fetched_at >= self.stale_ttl]
+            for cached in expired:
+                del self.entries[cached]
+
+    def claim_refresh(self, key: tuple):
+        """
+        Marks key as being refreshed
+        :return: bool, False if a refresh for key is already running
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def release_refresh(self, key: tuple):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.refreshing.clear()
+
+
+stores_queried = metrics.histogram('bapcs_microcenter_stores_queried',
+                                   'Store locations checked per Microcenter post',
+                                   metrics.COUNT_BUCKETS)
+stores_timed_out = metrics.counter('bapcs_microcenter_stores_timed_out_total',
+                                   'Store locations shown as unknown after STORE_DATA_TIMEOUT')
+
+inventory_cache = InventoryCache(INVENTORY_TTL, INVENTORY_STALE_TTL)
+refresh_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
 
 def strip_url(url: str):
     """
@@ -27,11 +129,15 @@ def strip_url(url: str):
     return url
 
 
-def get_page(url: str, store_num: str= '095'):
+def get_page(url: str, store_num: str= '095', timeout: float=None,
+             anchors: list=None):
     """
     Given a Microcenter URL, return request object
     :param url: str, microcenter url
     :param store_num: str, store number as string, defaults to MO - Brentwood
+    :param timeout: float, seconds to wait for a response, None for defaults
+    :param anchors: list of str, patterns after which to stop reading the
+    page, None reads it all
     :return: requests.model.Response, html from url
     """
     headers = {
@@ -39,7 +145,10 @@ def get_page(url: str, store_num: str= '095'):
         'DNT': '1',
         'Host': 'www.microcenter.com',
     }
-    return requests.get(url, headers=headers)
+    if anchors is not None:
+        return client.get_until(url, anchors, headers=headers,
+                                timeout=timeout, ttl=CACHE_TTL)
+    return client.get(url, headers=headers, timeout=timeout, ttl=CACHE_TTL)
 
 
 def extract_from_json(pattern: str, text: str):
@@ -115,11 +224,87 @@ def get_open_box(tree: html.HtmlElement):
     return None
 
 
-def get_store_data(url: str, stores: list):
+def get_product_id(url: str):
+    """
+    Given a Microcenter URL, return the product id or sku it refers to
+    :param url: str, microcenter url
+    :return: str, product id, sku, or the url itself if neither found
+    """
+    product_id = re.search(r'(?<=/product/)[0-9]+', url)
+    if product_id is None:
+        product_id = re.search(r'(?<=sku=)[0-9]+', url)
+    if product_id is None:
+        return url
+    return product_id.group(0)
+
+
+def fetch_store_data(url: str, store: tuple):
+    """
+    Given item url and a single store, fetch and parse that store's inventory
+    :param url: str, base product url
+    :param store: tuple, store name, store number
+    :return: tuple, store name, store number, inventory, open box; None if
+    nothing available at location
+    :raises requests.exceptions.RequestException: if the request failed
+    """
+    store_name, store_number = store
+    page = get_page(url, store_number, timeout=REQUEST_TIMEOUT)
+    tree = html.fromstring(page.content)
+    inventory = get_inventory(tree)
+    open_box = get_open_box(tree)
+    if inventory is not None or open_box is not None:
+        return store_name, store_number, inventory, open_box
+    return None
+
+
+def refresh_store_data(url: str, store: tuple, key: tuple):
+    """Refetches a stale inventory_cache entry, run in the background"""
+    try:
+        inventory_cache.put(key, fetch_store_data(url, store))
+    except requests.exceptions.RequestException as e:
+        mc_logger.error(f'{e.__class__}: {store[1]}: {e}')
+        inventory_cache.release_refresh(key)
+
+
+def get_single_store_data(url: str, store: tuple):
     """
-    Given item url and list of stores, return all store inventories
+    Given item url and a single store, return that store's inventory,
+    from inventory_cache when recent enough.  Stale entries are returned
+    and refreshed in the background
+    :param url: str, base product url
+    :param store: tuple, store name, store number
+    :return: tuple, store name, store number, inventory, open box; None if
+    nothing available at location or the request failed
+    """
+    key = (get_product_id(url), store[1])
+    line, state = inventory_cache.get(key)
+    if state == InventoryCache.FRESH:
+        return line
+    if state == InventoryCache.STALE:
+        if inventory_cache.claim_refresh(key):
+            refresh_executor.submit(refresh_store_data, url, store, key)
+        return line
+    try:
+        line = fetch_store_data(url, store)
+    except requests.exceptions.RequestException as e:
+        # Timeouts/dropped connections, skip this location
+        mc_logger.error(f'{e.__class__}: {store[1]}: {e}')
+        return None
+    inventory_cache.put(key, line)
+    return line
+
+
+def get_store_data(url: str, stores: list, max_workers: int=MAX_WORKERS,
+                   timeout: float=STORE_DATA_TIMEOUT):
+    """
+    Given item url and list of stores, return all store inventories.  Store
+    pages are requested concurrently, up to max_workers at a time.  Stores
+    not answered within timeout are listed with UNKNOWN_INVENTORY; their
+    requests finish in the background and fill inventory_cache
     :param url: str, base product url
     :param stores: list of tuples of store name, store number
+    :param max_workers: int, max concurrent store page requests
+    :param timeout: float, seconds to wait for all stores
     :return: dict, enabled columns & inventories as list of tuples
     """
     store_data = {
@@ -128,16 +313,28 @@ def get_store_data(url: str, stores: list):
         'Open Box': False,
         'inventories': [],
     }
-    for store_name, store_number in stores:
-        page = get_page(url, store_number)
-        tree = html.fromstring(page.content)
-        inventory = get_inventory(tree)
-        open_box = get_open_box(tree)
-        if open_box is not None:
+    stores_queried.observe(len(stores))
+    workers = max(1, min(max_workers, len(stores)))
+    get_line = client.propagate(lambda store: get_single_store_data(url, store))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(get_line, store): store for store in stores}
+        done, not_done = wait(futures, timeout=timeout)
+    finally:
+        executor.shutdown(wait=False)
+    lines = [future.result() for future in done]
+    for future in not_done:
+        future.cancel()
+        store_name, store_number = futures[future]
+        mc_logger.warning(f'{store_number}: no inventory after {timeout}s')
+        lines.append((store_name, store_number, UNKNOWN_INVENTORY, None))
+    stores_timed_out.inc(len(not_done))
+    for line in lines:
+        if line is None:
+            continue
+        if line[3] is not None:
             store_data['Open Box'] = True
-        if inventory is not None or open_box is not None:
-            line = (store_name, store_number, inventory, open_box)
-            store_data['inventories'].append(line)
+        store_data['inventories'].append(line)
     store_data['inventories'].sort(key=lambda store: store[0])
     return store_data
 
@@ -159,6 +356,25 @@ def get_metadata(text: str):
     return metadata
 
 
+@register_recrawl('microcenter.com')
+def get_product_details(url: str):
+    """
+    Given a product url, return product details without checking stores
+    :param url: str, microcenter product url
+    :return: dict, product_details
+    """
+    url = strip_url(url)
+    page = get_page(url, anchors=PAGE_ANCHORS)
+    metadata = get_metadata(page.text)
+
+    product_details = {
+        'mpn': metadata.get('mpn'),
+        'price': metadata.get('price'),
+    }
+
+    return product_details
+
+
 @register('microcenter.com')
 def mc_run(submission):
     """
@@ -167,7 +383,7 @@ def mc_run(submission):
     :return: dict, product_details and str, appropriate markdown
     """
     url = strip_url(submission.url)
-    page = get_page(url)
+    page = get_page(url, anchors=PAGE_ANCHORS)
     text = page.text
 
     metadata = get_metadata(text)
@@ -1,13 +1,20 @@
 import re
 
-import requests
-
+from network import client
 from logger import logger
-from stores.registration import register
+from stores.registration import register, register_recrawl
 
 
 newegg_logger = logger.get_logger('Newegg', './logfile.log')
 
+# seconds a cached page is used before revalidating
+CACHE_TTL = 900
+# page is only read until get_mpn and get_price can be answered
+PAGE_ANCHORS = [
+    r"product_model:\[\'[^\n]*\n",
+    r"product_sale_price:\[\'[^\n]*\n",
+]
+
 
 def convert_mobile_url(url: str):
     """
@@ -30,13 +37,13 @@ def convert_mobile_url(url: str):
 
 
 def get_page(url: str):
-    """Simple request based on url"""
+    """Request based on url, read only as far as PAGE_ANCHORS"""
     headers = {
         'DNT': '1',
         'Host': 'www.newegg.com',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
     }
-    return requests.get(url, headers=headers)
+    return client.get_until(url, PAGE_ANCHORS, headers=headers, ttl=CACHE_TTL)
 
 
 def extract_from_text(pattern: str, text: str):
@@ -89,18 +96,16 @@ def get_price(text: str):
         return price
 
 
-@register('newegg.com')
-def ne_run(submission):
+@register_recrawl('newegg.com')
+def get_product_details(url: str):
     """
-    Given a submission, return product details
-    :param submission: praw.Reddit.submission
-    :return: dict, product_details
+    Given a product url, return product details
+    :param url: str, newegg product url, mobile links are converted
+    :return: dict, product_details; None if url could not be converted
     """
-    # TODO: add markdown
-    try:
-        url = convert_mobile_url(submission.url)
-    except:
-        return None, None
+    url = convert_mobile_url(url)
+    if url is None:
+        return None
 
     page = get_page(url)
     text = page.text
@@ -113,6 +118,19 @@ def ne_run(submission):
         'price': price,
     }
 
+    return product_details
+
+
+@register('newegg.com')
+def ne_run(submission):
+    """
+    Given a submission, return product details
+    :param submission: praw.Reddit.submission
+    :return: dict, product_details
+    """
+    # TODO: add markdown
+    product_details = get_product_details(submission.url)
+
     markdown = None
 
     return product_details, markdown
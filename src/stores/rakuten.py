@@ -1,12 +1,15 @@
 import re
-import requests
 
-from stores.registration import register
+from network import client
+from stores.registration import register, register_recrawl
 from logger import logger
 
 
 rakuten_logger = logger.get_logger('Rakuten', './logfile.log')
 
+# seconds a cached page is used before revalidating
+CACHE_TTL = 900
+
 
 def get_page(url: str):
     """Simple request based on url"""
@@ -15,7 +18,7 @@ def get_page(url: str):
         'Host': 'www.rakuten.com',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
     }
-    return requests.get(url, headers=headers)
+    return client.get(url, headers=headers, ttl=CACHE_TTL)
 
 
 def get_price(text: str):
@@ -60,15 +63,14 @@ def get_mpn(text: str):
         return mpn
 
 
-@register('rakuten.com')
-def ra_run(submission):
+@register_recrawl('rakuten.com')
+def get_product_details(url: str):
     """
-    Given a submission, return product details
-    :param submission: praw.Reddit.submission
+    Given a product url, return product details
+    :param url: str, rakuten product url
     :return: dict, product_details
     """
-    # TODO: add markdown
-    page = get_page(submission.url)
+    page = get_page(url)
     text = page.text
 
     price = get_price(text)
@@ -79,6 +81,19 @@ def ra_run(submission):
         'price': price,
     }
 
+    return product_details
+
+
+@register('rakuten.com')
+def ra_run(submission):
+    """
+    Given a submission, return product details
+    :param submission: praw.Reddit.submission
+    :return: dict, product_details
+    """
+    # TODO: add markdown
+    product_details = get_product_details(submission.url)
+
     markdown = None
 
     return product_details, markdown
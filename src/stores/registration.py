@@ -1,4 +1,26 @@
+import importlib
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+
 site_functions = {}
+recrawl_functions = {}
+
+# directory scanned for store modules, independent of the working directory
+STORES_DIR = os.path.dirname(os.path.abspath(__file__))
+# package store modules are imported from
+STORES_PACKAGE = 'stores'
+# matches a decorator line, ex @register('microcenter.com'), but not one commented out
+REGISTER_PATTERN = re.compile(r'''^@register(?:_recrawl)?\(\s*['"]([^'"]+)['"]\s*\)''', re.MULTILINE)
+
+"""
+Domain: store module name, found by reading store sources for @register
+decorators without importing them.  Built on first lookup
+"""
+manifest = None
+manifest_lock = threading.Lock()
 
 
 def register(site_name: str):
@@ -20,3 +42,120 @@ def register(site_name: str):
         return site_function
     return register_site_func
 
+
+def register_recrawl(site_name: str):
+    """
+    Registers decorated functions in the .recrawl_functions dictionary, for
+    the price tracker to re-read a product page.  Functions take a product
+    url and return a product_details dict (mpn, price), or None
+    :param site_name: str, site domain, ex. 'microcenter.com'
+    :return: function register_recrawl_func
+    """
+    def register_recrawl_func(recrawl_function):
+        recrawl_functions[site_name] = recrawl_function
+        return recrawl_function
+    return register_recrawl_func
+
+
+def build_manifest(directory: str=STORES_DIR):
+    """
+    Scans store modules in directory for @register/@register_recrawl
+    decorators
+    :param directory: str, path to store modules
+    :return: dict, domain: module name
+    """
+    found = {}
+    for f in sorted(os.listdir(directory)):
+        module_name, ext = os.path.splitext(f)
+        if ext != '.py' or module_name in ('__init__', 'registration'):
+            continue
+        with open(os.path.join(directory, f), encoding='utf-8') as source:
+            for site_name in REGISTER_PATTERN.findall(source.read()):
+                found.setdefault(site_name, module_name)
+    return found
+
+
+def get_manifest():
+    """
+    :return: dict, domain: store module name, scanning /stores the first time
+    """
+    global manifest
+    with manifest_lock:
+        if manifest is None:
+            manifest = build_manifest()
+        return manifest
+
+
+def get_sites():
+    """
+    :return: list of str, every store domain, whether or not its module has
+    been imported yet
+    """
+    return sorted(set(get_manifest()) | set(site_functions))
+
+
+def load_site(site_name: str):
+    """
+    Imports the store module for site_name if it has not been yet, which
+    registers its functions
+    :param site_name: str, domain from the manifest
+    :return: nothing
+    """
+    module_name = get_manifest().get(site_name)
+    if module_name is not None:
+        importlib.import_module(f'{STORES_PACKAGE}.{module_name}')
+
+
+def get_site_name(url: str):
+    """
+    Finds the registered site for url's hostname, matching the hostname
+    itself or any parent domain, ex 'smile.amazon.com' -> 'amazon.com'.
+    Only the hostname is checked, so domains in paths or query strings
+    are ignored.  Each lookup is a dict hit per hostname label
+    :param url: str, link to check
+    :return: str, registered site name; None if not found
+    """
+    try:
+        hostname = urlsplit(url.strip()).hostname
+    except ValueError:
+        return None
+    if hostname is None:
+        return None
+    labels = hostname.rstrip('.').split('.')
+    known = get_manifest()
+    for i in range(len(labels) - 1):
+        domain = '.'.join(labels[i:])
+        if domain in site_functions or domain in known:
+            return domain
+    return None
+
+
+def get_site_function(url: str):
+    """
+    Looks up the site function registered for url's hostname, importing
+    its store module on first use
+    :param url: str, link to check
+    :return: tuple, name of site found and function to call to parse;
+    None, None if not found
+    """
+    site_name = get_site_name(url)
+    if site_name is None:
+        return None, None
+    if site_name not in site_functions:
+        load_site(site_name)
+    site_function = site_functions.get(site_name)
+    if site_function is None:
+        return None, None
+    return site_name, site_function
+
+
+def get_recrawl_function(site_name: str):
+    """
+    Looks up the recrawl function registered for site_name, importing its
+    store module on first use
+    :param site_name: str, site domain, ex. 'newegg.com'
+    :return: function, takes a product url; None if not registered
+    """
+    if site_name not in recrawl_functions:
+        load_site(site_name)
+    return recrawl_functions.get(site_name)
@@ -1,5 +1,7 @@
 import urllib.parse
 
+from database.price_index import price_index
+
 
 def none_to_empty_string(data: str):
     return '' if data is None else data
@@ -14,9 +16,28 @@ def get_header(metadata: dict):
     table_format = ':-|-:|:-:\n'
     table_body = f'{mpn}|{price}|{store_only}'
 
-    return (table_header
-            + table_format
-            + table_body)
+    header = (table_header
+              + table_format
+              + table_body)
+
+    price_history = get_price_history(metadata.get('mpn'))
+    if price_history is not None:
+        header += '  \n\n' + price_history
+
+    return header
+
+
+def get_price_history(mpn: str):
+    """
+    Lowest and last price recorded for mpn, from the in-memory price index
+    :param mpn: str, manufacturer part number
+    :return: str, markdown line if a price has been recorded, else None
+    """
+    record = price_index.get(mpn)
+    if record is None:
+        return None
+    return (f'Lowest seen: ${record.min_price} at {record.min_site} on {record.min_date} | '
+            f'Last seen: ${record.last_price} at {record.last_site} on {record.last_date}')
 
 
 def get_search_links(mpn: str):
@@ -1,6 +1,12 @@
+from metrics import metrics
 from templates import base
 
 
+render_seconds = metrics.histogram('bapcs_render_seconds',
+                                   'Reply markdown rendering time by template')
+
+
+@metrics.timed(render_seconds, template='ebay')
 def build_markdown(listing_data: dict):
     """
 
@@ -15,6 +21,10 @@ def build_markdown(listing_data: dict):
         base.get_footer(listing_data.get('MPN (probably)'))
     ]
 
+    price_history = base.get_price_history(listing_data.get('MPN (probably)'))
+    if price_history is not None:
+        lines.insert(0, price_history)
+
     return line_split.join(lines)
 
 
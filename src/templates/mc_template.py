@@ -1,6 +1,12 @@
+from metrics import metrics
 from templates import base
 
 
+render_seconds = metrics.histogram('bapcs_render_seconds',
+                                   'Reply markdown rendering time by template')
+
+
+@metrics.timed(render_seconds, template='microcenter')
 def build_markdown(store_data: dict, metadata: dict, url: str):
     """
     given locations(location, inventory) and metadata, return reddit-structured markdown
@@ -0,0 +1,327 @@
+import datetime
+import heapq
+import itertools
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from logger import logger
+from database import price_history
+from database.base import Base, SessionMode, get_engine, session_scope
+from database.price_index import price_index
+from metrics import metrics
+from network import breaker
+from models.price import PriceObservation
+from models.tracked_product import TrackedProduct
+from network.ratelimit import TokenBucket
+from stores import registration
+
+
+tracker_logger = logger.get_logger('PriceTracker', './logfile.log')
+
+"""
+Products are first revisited MIN_INTERVAL after their post.  Each visit
+that finds the same price multiplies the interval by BACKOFF, up to
+MAX_INTERVAL; a price change or a repost of the product drops it back to
+MIN_INTERVAL
+"""
+MIN_INTERVAL = 60 * 60
+MAX_INTERVAL = 24 * 60 * 60
+BACKOFF = 2
+# products are dropped MAX_AGE seconds after their post, or after MAX_FAILURES failed visits in a row
+MAX_AGE = 30 * 24 * 60 * 60
+MAX_FAILURES = 5
+# request budget per store domain, DOMAIN_RATE per second in bursts of DOMAIN_BURST
+DOMAIN_RATE = 1 / 30
+DOMAIN_BURST = 2
+# seconds to put a visit off while the stream has submissions waiting
+BUSY_WAIT = 5
+# most seconds newly tracked products wait before being saved, in one batch
+SAVE_INTERVAL = 5
+# longer product urls do not fit the tracked_products table and are not tracked
+MAX_URL_LENGTH = TrackedProduct.__table__.c.url.type.length
+
+recrawls = metrics.counter('bapcs_recrawls_total',
+                           'Tracked product visits by site and result')
+tracked_products = metrics.gauge('bapcs_tracked_products',
+                                 'Products scheduled for price visits')
+
+
+def create_tables():
+    """Creates the tracked products table if it does not exist yet"""
+    Base.metadata.create_all(get_engine(), tables=[TrackedProduct.__table__])
+
+
+def utc_now():
+    return datetime.datetime.utcnow()
+
+
+class PriceTracker:
+    """
+    Revisits product pages from recent posts on a background thread and
+    records each price seen as a PriceObservation.  Visits are kept in a
+    heap by due time, pages are read with the stores' registered recrawl
+    functions, and each store domain has its own TokenBucket budget and
+    shares the store's circuit breaker.  Visits only run while is_idle()
+    is True, otherwise they are put off.  track only touches memory; the
+    background thread saves newly tracked products in batches every
+    SAVE_INTERVAL, so callers never wait on or fail with the db
+    :attr is_idle: callable, returns True when visits may run
+    :attr min_interval: float, seconds to first and hot visits
+    :attr max_interval: float, most seconds between visits
+    :attr max_age: float, seconds after its post a product is dropped
+    :attr domain_rate: float, visits per second allowed per domain
+    :attr domain_burst: float, visits allowed at once per domain
+    """
+    def __init__(self,
+                 is_idle=None,
+                 min_interval: float=MIN_INTERVAL,
+                 max_interval: float=MAX_INTERVAL,
+                 max_age: float=MAX_AGE,
+                 domain_rate: float=DOMAIN_RATE,
+                 domain_burst: float=DOMAIN_BURST,
+                 ):
+        self.is_idle = is_idle if is_idle is not None else lambda: True
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_age = datetime.timedelta(seconds=max_age)
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.schedule = []
+        self.products = {}
+        self.unsaved = {}
+        self.buckets = {}
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = None
+
+    def __len__(self):
+        with self.condition:
+            return len(self.products)
+
+    def start(self):
+        """Starts the background thread that visits products"""
+        if self.thread is not None:
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run,
+                                       name='price-tracker',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread after any visit in progress, saving
+        products tracked since its last save
+        """
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.save_pending()
+
+    def load(self):
+        """
+        Schedules tracked products saved by earlier runs that are not past
+        max_age
+        :return: nothing
+        """
+        with session_scope(SessionMode.READ) as session:
+            products = session.query(TrackedProduct)\
+                              .filter(TrackedProduct.added >= utc_now() - self.max_age)\
+                              .all()
+        with self.condition:
+            for product in products:
+                self.products[product.url] = product
+                self.push(product)
+        tracker_logger.info(f'loaded {len(products)} tracked products')
+
+    def track(self, fullname: str, url: str, site: str, mpn: str, price: int):
+        """
+        Schedules url for price visits, if its store has a recrawl function.
+        A url already tracked is treated as hot and visited soon.  The
+        product is saved to db later by the background thread
+        :param fullname: str, fullname of the post linking url
+        :param url: str, product page
+        :param site: str, registered store domain
+        :param mpn: str, manufacturer part number
+        :param price: int, price seen in the post
+        :return: nothing
+        """
+        if registration.get_recrawl_function(site) is None:
+            return
+        if len(url) > MAX_URL_LENGTH:
+            tracker_logger.warning(f'not tracking {fullname}, url too long')
+            return
+        now = utc_now()
+        with self.condition:
+            product = self.products.get(url)
+            if product is None:
+                product = TrackedProduct(fullname, url, site, mpn, price,
+                                         now, int(self.min_interval))
+                self.products[url] = product
+            else:
+                product.interval = int(self.min_interval)
+                product.next_crawl = now + datetime.timedelta(seconds=self.min_interval)
+            self.unsaved[url] = product
+            self.push(product)
+
+    def push(self, product: TrackedProduct):
+        """Adds product to the schedule at its next_crawl, lock held"""
+        heapq.heappush(self.schedule, (product.next_crawl, next(self.sequence), product))
+        tracked_products.set(len(self.products))
+        self.condition.notify()
+
+    def put_off(self, product: TrackedProduct, seconds: float):
+        with self.condition:
+            product.next_crawl = utc_now() + datetime.timedelta(seconds=seconds)
+            self.push(product)
+
+    def next_due(self, timeout: float=None):
+        """
+        Waits until the earliest product is due
+        :param timeout: float, most seconds to wait, None to wait until one is
+        :return: TrackedProduct, None once stopping or after timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while not self.stopping:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return None
+                if not self.schedule:
+                    self.condition.wait(left)
+                    continue
+                next_crawl, _, product = self.schedule[0]
+                if (next_crawl != product.next_crawl
+                        or self.products.get(product.url) is not product):
+                    # rescheduled or dropped since pushed
+                    heapq.heappop(self.schedule)
+                    continue
+                wait = (next_crawl - utc_now()).total_seconds()
+                if wait > 0:
+                    self.condition.wait(wait if left is None else min(wait, left))
+                    continue
+                heapq.heappop(self.schedule)
+                return product
+            return None
+
+    def run(self):
+        while True:
+            product = self.next_due(SAVE_INTERVAL)
+            self.save_pending()
+            if product is None:
+                with self.condition:
+                    if self.stopping:
+                        return
+                continue
+            if not self.is_idle():
+                self.put_off(product, BUSY_WAIT)
+                continue
+            bucket = self.buckets.setdefault(
+                product.site, TokenBucket(self.domain_rate, self.domain_burst))
+            if not bucket.try_acquire():
+                self.put_off(product, bucket.delay())
+                continue
+            site_breaker = breaker.get_breaker(product.site)
+            if not site_breaker.allow():
+                self.put_off(product, site_breaker.current_cooldown)
+                continue
+            try:
+                self.visit(product)
+            except Exception as e:
+                tracker_logger.error(f'{e.__class__}: {e}')
+                self.put_off(product, self.max_interval)
+
+    def visit(self, product: TrackedProduct):
+        """
+        Reads the current price for product, records it, and schedules the
+        next visit
+        :param product: TrackedProduct, product due
+        :return: nothing
+        """
+        recrawl_function = registration.get_recrawl_function(product.site)
+        try:
+            product_details = recrawl_function(product.url) or {}
+        except Exception as e:
+            tracker_logger.error(f'{e.__class__}: {e}')
+            product_details = {}
+        price = product_details.get('price')
+        breaker.get_breaker(product.site).record(price is not None)
+
+        if price is None:
+            result = 'failed'
+            product.failures += 1
+            product.interval = int(min(self.max_interval, product.interval * BACKOFF))
+        else:
+            result = 'changed' if price != product.price else 'unchanged'
+            product.failures = 0
+            product.price = price
+            product.mpn = product_details.get('mpn') or product.mpn
+            if result == 'changed':
+                product.interval = int(self.min_interval)
+            else:
+                product.interval = int(min(self.max_interval, product.interval * BACKOFF))
+        recrawls.inc(site=product.site, result=result)
+
+        now = utc_now()
+        product.next_crawl = now + datetime.timedelta(seconds=product.interval)
+        expired = (product.failures >= MAX_FAILURES
+                   or now - product.added >= self.max_age)
+
+        today = datetime.date.today()
+        with session_scope(SessionMode.WRITE) as session:
+            if expired:
+                session.query(TrackedProduct)\
+                       .filter(TrackedProduct.id == product.id)\
+                       .delete(synchronize_session=False)
+            else:
+                self.merge(session, product)
+            if price is not None and product.mpn:
+                price_history.add_observations(session, [PriceObservation(
+                    product.reddit_fullname, product.mpn, product.site, price, today)])
+        if price is not None:
+            price_index.add(product.mpn, price, product.site, today)
+
+        with self.condition:
+            if expired:
+                del self.products[product.url]
+                self.unsaved.pop(product.url, None)
+                tracked_products.set(len(self.products))
+            else:
+                self.push(product)
+
+    def save_pending(self):
+        """
+        Saves products tracked since the last save in one transaction.  On
+        a db error they are kept to retry on the next save
+        :return: int, number of products saved
+        """
+        with self.condition:
+            products = [product for url, product in self.unsaved.items()
+                        if self.products.get(url) is product]
+            self.unsaved = {}
+        if not products:
+            return 0
+        try:
+            with session_scope(SessionMode.WRITE) as session:
+                for product in products:
+                    self.merge(session, product)
+        except SQLAlchemyError as e:
+            tracker_logger.error(f'{e.__class__}: {e}, keeping {len(products)} to retry')
+            with self.condition:
+                for product in products:
+                    self.unsaved.setdefault(product.url, product)
+            return 0
+        return len(products)
+
+    @staticmethod
+    def merge(session, product: TrackedProduct):
+        """Inserts or updates product in session, setting its id"""
+        merged = session.merge(product)
+        session.flush()
+        product.id = merged.id
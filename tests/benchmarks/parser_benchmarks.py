@@ -0,0 +1,210 @@
+"""
+Offline parser benchmarks.  Runs each store's extraction functions against
+the pages in ./fixtures and reports latency percentiles and peak memory
+allocated per call.  Fixtures hold the markup each parser keys on inside
+page-sized filler, and can be replaced with live pages via record.py.
+As a test, fails if a parser's median latency or peak allocation regressed
+past baseline.json by more than the tolerances below.
+
+Run from project root, with PYTHONPATH=.:src
+    python -m unittest tests.benchmarks.parser_benchmarks
+    python -m tests.benchmarks.parser_benchmarks                   (report)
+    python -m tests.benchmarks.parser_benchmarks --update-baseline (record)
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+import unittest
+
+from lxml import html
+
+from src.stores import amazon, bestbuy, ebay, frys, microcenter, newegg, rakuten
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+ITERATIONS = 200
+WARMUP = 10
+# allowed slowdown/growth over baseline before a benchmark fails
+LATENCY_TOLERANCE = 2.0
+LATENCY_SLACK_MS = 0.05
+MEMORY_TOLERANCE = 1.5
+MEMORY_SLACK_KIB = 16
+
+
+def load_fixture(name: str):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def as_text(content: bytes):
+    return content.decode('utf-8')
+
+
+def as_tree(content: bytes):
+    return html.fromstring(content)
+
+
+def as_ebay_index(content: bytes):
+    return ebay.build_index(html.fromstring(content))
+
+
+"""
+name: (fixture, prepare input from page bytes, extraction function).
+Input preparation is not timed, only the extraction function is
+"""
+BENCHMARKS = {
+    'amazon.get_price': ('amazon.html', as_tree, amazon.get_price),
+    'amazon.get_mpn': ('amazon.html', as_text, amazon.get_mpn),
+    'bestbuy.get_price': ('bestbuy.html', as_text, bestbuy.get_price),
+    'bestbuy.get_mpn': ('bestbuy.html', as_tree, bestbuy.get_mpn),
+    'ebay.build_index': ('ebay.html', as_tree, ebay.build_index),
+    'ebay.get_price': ('ebay.html', as_ebay_index, ebay.get_price),
+    'ebay.get_seller': ('ebay.html', as_ebay_index, ebay.get_seller),
+    'ebay.get_feedback': ('ebay.html', as_ebay_index, ebay.get_feedback),
+    'frys.get_price': ('frys.html', as_tree, frys.get_price),
+    'frys.get_mpn': ('frys.html', as_tree, frys.get_mpn),
+    'microcenter.get_metadata': ('microcenter.html', as_text, microcenter.get_metadata),
+    'microcenter.get_stores': ('microcenter.html', as_text, microcenter.get_stores),
+    'microcenter.get_inventory': ('microcenter_store.html', as_tree, microcenter.get_inventory),
+    'microcenter.get_open_box': ('microcenter_store.html', as_tree, microcenter.get_open_box),
+    'newegg.get_price': ('newegg.html', as_text, newegg.get_price),
+    'newegg.get_mpn': ('newegg.html', as_text, newegg.get_mpn),
+    'rakuten.get_price': ('rakuten.html', as_text, rakuten.get_price),
+    'rakuten.get_mpn': ('rakuten.html', as_text, rakuten.get_mpn),
+}
+
+
+def percentile(ordered: list, pct: float):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(function, data, iterations: int=ITERATIONS):
+    """
+    Times function(data) and measures its peak allocation
+    :param function: function, extraction function to benchmark
+    :param data: str, html.HtmlElement or dict, function's input
+    :param iterations: int, timed calls
+    :return: dict, p50/p90/p99 in ms and peak allocation in KiB
+    """
+    for _ in range(WARMUP):
+        function(data)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    # starting tracing clears the peak
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        function(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'p99_ms': percentile(timings, 99),
+        'peak_kib': (peak - before) / 1024,
+    }
+
+
+def run_benchmarks(iterations: int=ITERATIONS):
+    """
+    Runs every benchmark
+    :return: dict, benchmark name: results from measure
+    """
+    results = {}
+    for name, (fixture, prepare, function) in BENCHMARKS.items():
+        data = prepare(load_fixture(fixture))
+        results[name] = measure(function, data, iterations)
+    return results
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict):
+    baseline = {name: {'p50_ms': round(result['p50_ms'], 4),
+                       'peak_kib': round(result['peak_kib'], 1)}
+                for name, result in results.items()}
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def find_regressions(results: dict, baseline: dict):
+    """
+    Compares results to baseline
+    :return: list of str, description of each regression
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        max_ms = expected['p50_ms'] * LATENCY_TOLERANCE + LATENCY_SLACK_MS
+        if result['p50_ms'] > max_ms:
+            regressions.append(f'{name}: p50 {result["p50_ms"]:.3f} ms, '
+                               f'baseline {expected["p50_ms"]:.3f} ms')
+        max_kib = expected['peak_kib'] * MEMORY_TOLERANCE + MEMORY_SLACK_KIB
+        if result['peak_kib'] > max_kib:
+            regressions.append(f'{name}: peak {result["peak_kib"]:.1f} KiB, '
+                               f'baseline {expected["peak_kib"]:.1f} KiB')
+    return regressions
+
+
+def format_report(results: dict):
+    lines = [f'{"parser":<28}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}'
+             f'{"peak KiB":>10}']
+    for name, result in results.items():
+        lines.append(f'{name:<28}'
+                     f'{result["p50_ms"]:>10.3f}'
+                     f'{result["p90_ms"]:>10.3f}'
+                     f'{result["p99_ms"]:>10.3f}'
+                     f'{result["peak_kib"]:>10.1f}')
+    return '\n'.join(lines)
+
+
+class ParserBenchmarks(unittest.TestCase):
+
+    def test_extractors_return_data(self):
+        for name, (fixture, prepare, function) in BENCHMARKS.items():
+            with self.subTest(name):
+                self.assertIsNotNone(function(prepare(load_fixture(fixture))))
+
+    def test_no_regressions(self):
+        baseline = load_baseline()
+        if not baseline:
+            self.skipTest('no baseline.json, run with --update-baseline')
+        results = run_benchmarks()
+        print('\n' + format_report(results))
+        regressions = find_regressions(results, baseline)
+        self.assertEqual([], regressions, '\n'.join(regressions))
+
+
+if __name__ == '__main__':
+    results = run_benchmarks()
+    print(format_report(results))
+    if '--update-baseline' in sys.argv:
+        save_baseline(results)
+        print(f'baseline written to {BASELINE_PATH}')
+    else:
+        regressions = find_regressions(results, load_baseline())
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if regressions else 0)
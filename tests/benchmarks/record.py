@@ -0,0 +1,64 @@
+"""
+Records a live store page as a benchmark fixture.
+
+The fixtures checked in are synthetic: each holds the markup its parsers
+key on (prices, mpns, inventory json, ...) copied from a real page, inside
+page-sized filler.  They keep the benchmarks stable and offline, but do not
+track store redesigns; record real pages over them to benchmark those.
+
+Run from /src:
+    python ../tests/benchmarks/record.py <url> <fixture name> [--cookie COOKIE]
+ex.
+    python ../tests/benchmarks/record.py https://www.newegg.com/p/N82E16813144219 newegg.html
+    python ../tests/benchmarks/record.py https://www.microcenter.com/product/501644 \
+        microcenter_store.html --cookie storeSelected=101
+
+The whole page is saved, even for stores that normally stop reading early.
+Re-run the benchmarks with --update-baseline after replacing a fixture.
+"""
+import argparse
+import os
+import sys
+
+# run as a script, so only this directory is on sys.path; add /src for the bot's packages
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+
+from network import client
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'fixtures')
+
+HEADERS = {
+    'DNT': '1',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+}
+
+
+def record(url: str, fixture: str, cookie: str=None):
+    """
+    Saves url's page to FIXTURES_DIR/fixture
+    :param url: str, store page url
+    :param fixture: str, fixture file name
+    :param cookie: str, Cookie header to send, ex 'storeSelected=101' for a
+    Microcenter store inventory page
+    :return: int, bytes written
+    """
+    headers = dict(HEADERS)
+    if cookie is not None:
+        headers['Cookie'] = cookie
+    response = client.get(url, headers=headers)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES_DIR, fixture), 'wb') as f:
+        f.write(response.content)
+    return len(response.content)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record a store page as a benchmark fixture')
+    parser.add_argument('url', help='store page to record')
+    parser.add_argument('fixture', help='fixture file name, ex newegg.html')
+    parser.add_argument('--cookie', help='Cookie header to send')
+    args = parser.parse_args()
+    written = record(args.url, args.fixture, args.cookie)
+    print(f'{written} bytes written to {args.fixture}')
@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from src.database.dedupe import *
+
+
+class DedupeIndexTests(unittest.TestCase):
+
+    def test_contains_added_fullname(self):
+        followed = DedupeIndex()
+        followed.add('t3_a4hafgh')
+
+        self.assertIn('t3_a4hafgh', followed)
+        self.assertNotIn('t3_b5ibgi', followed)
+
+    def test_least_recent_evicted_past_max_size(self):
+        followed = DedupeIndex(max_size=2)
+        followed.update(['t3_1', 't3_2'])
+        # touching t3_1 makes t3_2 the least recently seen
+        self.assertIn('t3_1', followed)
+        followed.add('t3_3')
+
+        self.assertEqual(2, len(followed))
+        self.assertIn('t3_1', followed)
+        self.assertNotIn('t3_2', followed)
+        self.assertIn('t3_3', followed)
+
+    def test_expired_after_max_age(self):
+        followed = DedupeIndex(max_age=60)
+        with mock.patch('src.database.dedupe.time.monotonic', return_value=0):
+            followed.add('t3_1')
+        with mock.patch('src.database.dedupe.time.monotonic', return_value=30):
+            followed.add('t3_2')
+        with mock.patch('src.database.dedupe.time.monotonic', return_value=75):
+            self.assertNotIn('t3_1', followed)
+            self.assertIn('t3_2', followed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import os
+
+from database import base
+
+
+MEMORY_URL = 'sqlite://'
+
+
+def use_memory_db():
+    """
+    Points the db engine, created on first use, at an in-memory sqlite db,
+    whatever DATABASE_URL the environment has, so tests never touch a real
+    database.  An engine already made for another url is dropped.  Call
+    before the first query, ie in setUp
+    :return: nothing
+    """
+    os.environ['DATABASE_URL'] = MEMORY_URL
+    with base.engine_lock:
+        if base.engine is not None and str(base.engine.url) != MEMORY_URL:
+            base.engine.dispose()
+            base.engine = None
@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+
+from src.database.lease import *
+from tests.database.helpers import use_memory_db
+
+
+class SqlLeaseBackendTests(unittest.TestCase):
+
+    def setUp(self):
+        use_memory_db()
+        Base.metadata.create_all(get_engine())
+        self.first = SqlLeaseBackend('node-1', duration=60)
+        self.second = SqlLeaseBackend('node-2', duration=60)
+
+    def tearDown(self):
+        Base.metadata.drop_all(get_engine())
+
+    def later(self, seconds):
+        later = utc_now() + datetime.timedelta(seconds=seconds)
+        return mock.patch('src.database.lease.utc_now', return_value=later)
+
+    def test_one_node_claims(self):
+        self.assertTrue(self.first.claim('t3_a'))
+        self.assertFalse(self.second.claim('t3_a'))
+
+    def test_expired_claim_taken_over(self):
+        self.first.claim('t3_a')
+        with self.later(120):
+            self.assertEqual(['t3_a'], self.second.claim_expired())
+            self.assertFalse(self.first.claim('t3_a'))
+
+    def test_done_claim_not_taken_over(self):
+        self.first.claim('t3_a')
+        self.first.complete('t3_a')
+        with self.later(120):
+            self.assertEqual([], self.second.claim_expired())
+            self.assertFalse(self.second.claim('t3_a'))
+
+    def test_gives_up_after_max_attempts(self):
+        first = SqlLeaseBackend('node-1', duration=60, max_attempts=2)
+        first.claim('t3_a')
+        with self.later(120):
+            self.assertTrue(first.claim('t3_a'))
+        with self.later(240):
+            self.assertEqual([], first.claim_expired())
+
+    def test_purge(self):
+        self.first.claim('t3_a')
+        self.first.complete('t3_a')
+        with self.later(120):
+            self.assertEqual(1, self.first.purge(max_age=30))
+
+    def test_released_claim_taken_over_after_delay(self):
+        self.first.claim('t3_a')
+        self.first.release('t3_a', delay=300)
+
+        with self.later(120):
+            self.assertEqual([], self.second.claim_expired())
+        with self.later(360):
+            self.assertEqual(['t3_a'], self.second.claim_expired())
+
+    def test_takeover_after_reply_before_write_is_replied(self):
+        self.first.claim('t3_a')
+        self.assertFalse(self.first.is_replied('t3_a'))
+        self.first.mark_replied('t3_a')
+        with self.later(120):
+            self.assertEqual(['t3_a'], self.second.claim_expired())
+        self.assertTrue(self.second.is_replied('t3_a'))
+
+    def test_mark_replied_needs_claim(self):
+        self.first.claim('t3_a')
+        self.second.mark_replied('t3_a')
+
+        self.assertFalse(self.first.is_replied('t3_a'))
+
+    def test_complete_all(self):
+        self.first.claim('t3_a')
+        self.first.claim('t3_b')
+        self.first.complete_all(['t3_a', 't3_b'])
+        with self.later(120):
+            self.assertEqual([], self.second.claim_expired())
+
+
+class NoLeaseBackendTests(unittest.TestCase):
+
+    def setUp(self):
+        use_memory_db()
+        Base.metadata.drop_all(get_engine())
+
+    def test_needs_no_table(self):
+        leases = NoLeaseBackend()
+        self.assertTrue(leases.claim('t3_a'))
+        leases.release('t3_a', delay=300)
+        leases.complete('t3_a')
+
+        self.assertEqual([], leases.claim_expired())
+
+
+class PendingCompletionsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.completed = []
+        self.completions = PendingCompletions(self.completed.extend)
+
+    def test_completes_after_every_step(self):
+        self.completions.expect('t3_a', {PendingCompletions.WRITE,
+                                         PendingCompletions.REPLY})
+
+        self.completions.done(['t3_a'], PendingCompletions.WRITE)
+        self.assertEqual([], self.completed)
+
+        self.completions.done(['t3_a'], PendingCompletions.REPLY)
+        self.assertEqual(['t3_a'], self.completed)
+        self.assertEqual(0, len(self.completions))
+
+    def test_forgotten_never_completed(self):
+        self.completions.expect('t3_a', {PendingCompletions.WRITE,
+                                         PendingCompletions.REPLY})
+        self.completions.forget('t3_a')
+        self.completions.done(['t3_a'], PendingCompletions.WRITE)
+
+        self.assertEqual([], self.completed)
+
+
+if __name__ == '__main__':
+    unittest.main()
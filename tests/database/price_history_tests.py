@@ -0,0 +1,81 @@
+import datetime
+import unittest
+from unittest import mock
+
+from src.database.price_history import *
+from tests.database.helpers import use_memory_db
+
+
+def make_post(fullname, mpn, site, price, date):
+    return Post(fullname, mpn, price, date, site)
+
+
+class PriceHistoryTests(unittest.TestCase):
+
+    def setUp(self):
+        use_memory_db()
+        Base.metadata.create_all(get_engine())
+        self.monday = datetime.date(2019, 1, 7)
+        self.tuesday = datetime.date(2019, 1, 8)
+
+    def tearDown(self):
+        Base.metadata.drop_all(get_engine())
+
+    def record(self, posts):
+        with session_scope(SessionMode.WRITE) as session:
+            session.bulk_save_objects(posts)
+            return record_observations(session, posts)
+
+    def test_skips_posts_without_price(self):
+        added = self.record([make_post('t3_a', 'MPN1', 'newegg.com', 100, self.monday),
+                             make_post('t3_b', None, 'newegg.com', 100, self.monday),
+                             make_post('t3_c', 'MPN1', 'newegg.com', None, self.monday)])
+
+        self.assertEqual(1, added)
+        self.assertEqual([(self.monday, 'newegg.com', 100)], price_history('MPN1'))
+
+    def test_rollup_inserted_concurrently_folded_in(self):
+        self.record([make_post('t3_a', 'MPN1', 'newegg.com', 100, self.monday)])
+        fold = fold_rollup
+        misses = []
+
+        def miss_once(session, rollup):
+            # another writer inserts the row after this one found it missing
+            if not misses:
+                misses.append(rollup)
+                return False
+            return fold(session, rollup)
+
+        with mock.patch('src.database.price_history.fold_rollup', side_effect=miss_once):
+            added = self.record([make_post('t3_b', 'MPN1', 'newegg.com', 80, self.monday)])
+
+        self.assertEqual(1, added)
+        self.assertEqual([(self.monday, 'newegg.com', 80, 100, 90)], daily_prices('MPN1'))
+        self.assertEqual(2, len(price_history('MPN1')))
+
+    def test_rollups_updated_incrementally(self):
+        self.record([make_post('t3_a', 'MPN1', 'newegg.com', 100, self.monday),
+                     make_post('t3_b', 'MPN1', 'newegg.com', 80, self.monday)])
+        self.record([make_post('t3_c', 'MPN1', 'newegg.com', 120, self.monday),
+                     make_post('t3_d', 'MPN1', 'amazon.com', 90, self.tuesday),
+                     make_post('t3_e', 'MPN2', 'newegg.com', 10, self.monday)])
+
+        expected = [(self.monday, 'newegg.com', 80, 120, 100),
+                    (self.tuesday, 'amazon.com', 90, 90, 90)]
+        self.assertEqual(expected, daily_prices('MPN1'))
+        self.assertEqual(expected[1:], daily_prices('MPN1', since=self.tuesday))
+        self.assertEqual(expected[:1], daily_prices('MPN1', site='newegg.com'))
+
+    def test_rebuild_from_posts(self):
+        with session_scope(SessionMode.WRITE) as session:
+            session.add_all([make_post('t3_a', 'MPN1', 'newegg.com', 100, self.monday),
+                             make_post('t3_b', 'MPN1', 'newegg.com', 90, self.tuesday)])
+
+        self.assertEqual(2, rebuild(chunk_size=1))
+        self.assertEqual([(self.monday, 'newegg.com', 100),
+                          (self.tuesday, 'newegg.com', 90)],
+                         price_history('MPN1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
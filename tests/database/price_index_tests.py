@@ -0,0 +1,40 @@
+import datetime
+import unittest
+
+from src.database.price_index import *
+
+
+class PriceIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.monday = datetime.date(2019, 1, 7)
+        self.tuesday = datetime.date(2019, 1, 8)
+
+    def test_tracks_lowest_and_last(self):
+        prices = PriceIndex()
+        prices.update([('MPN1', 100, 'newegg.com', self.monday),
+                       ('MPN1', 80, 'amazon.com', self.monday),
+                       ('MPN1', 120, 'newegg.com', self.tuesday)])
+
+        expected = PriceRecord(80, 'amazon.com', self.monday,
+                               120, 'newegg.com', self.tuesday)
+        self.assertEqual(expected, prices.get('MPN1'))
+
+    def test_mpn_case_insensitive(self):
+        prices = PriceIndex()
+        prices.add('abc-123', 50, 'frys.com', self.monday)
+
+        self.assertEqual(50, prices.get('ABC-123').last_price)
+
+    def test_ignores_missing_price(self):
+        prices = PriceIndex()
+        prices.add('MPN1', None, 'frys.com', self.monday)
+        prices.add(None, 50, 'frys.com', self.monday)
+
+        self.assertIsNone(prices.get('MPN1'))
+        self.assertIsNone(prices.get(None))
+        self.assertEqual(0, len(prices))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import datetime
+import threading
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.database.writer import *
+from tests.database.helpers import use_memory_db
+
+
+def make_post(fullname):
+    return Post(fullname, 'MPN1', 100, datetime.date(2019, 1, 7), 'newegg.com')
+
+
+def written_fullnames():
+    with session_scope(SessionMode.READ) as session:
+        return sorted(fullname for fullname, in session.query(Post.reddit_fullname))
+
+
+class PostWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        use_memory_db()
+        price_history.Base.metadata.create_all(price_history.get_engine())
+        self.writer = PostWriter(max_batch=10, max_delay=0.05)
+
+    def tearDown(self):
+        self.writer.close()
+        price_history.Base.metadata.drop_all(price_history.get_engine())
+
+    def test_flush_writes_buffered_posts(self):
+        self.writer.add(make_post('t3_a'))
+        self.writer.add(make_post('t3_b'))
+
+        self.assertEqual(2, self.writer.flush())
+        self.assertEqual(['t3_a', 't3_b'], written_fullnames())
+
+    def test_on_written_after_commit(self):
+        written = []
+        self.writer.on_written = lambda posts: written.append(
+            ([post.reddit_fullname for post in posts], written_fullnames())
+        )
+        self.writer.add(make_post('t3_a'))
+        self.writer.flush()
+
+        self.assertEqual([(['t3_a'], ['t3_a'])], written)
+
+    def test_failed_flush_keeps_posts(self):
+        self.writer.add(make_post('t3_a'))
+        error = OperationalError('INSERT', {}, Exception('database is locked'))
+
+        self.writer.on_written = mock.Mock()
+        with mock.patch.object(PostWriter, 'write', side_effect=error):
+            self.assertEqual(0, self.writer.flush())
+        self.writer.on_written.assert_not_called()
+
+        self.writer.add(make_post('t3_b'))
+        self.assertEqual(2, self.writer.flush())
+        self.assertEqual(['t3_a', 't3_b'], written_fullnames())
+
+    def test_duplicate_post_skipped(self):
+        self.writer.add(make_post('t3_a'))
+        self.writer.flush()
+        self.writer.add(make_post('t3_a'))
+        self.writer.add(make_post('t3_b'))
+
+        with mock.patch.object(PostWriter, 'write',
+                               side_effect=IntegrityError('INSERT', {}, Exception('UNIQUE'))):
+            self.assertEqual(1, self.writer.flush())
+        self.assertEqual(['t3_a', 't3_b'], written_fullnames())
+
+    def test_other_integrity_error_keeps_posts(self):
+        error = IntegrityError('INSERT', {}, Exception('uq_daily_prices_mpn_site_date'))
+        self.writer.add(make_post('t3_a'))
+
+        with mock.patch.object(price_history, 'record_observations', side_effect=error):
+            self.assertEqual(0, self.writer.flush())
+
+        self.assertEqual([], written_fullnames())
+        self.assertEqual(1, len(self.writer.buffer))
+
+    def test_adds_during_outage_do_not_write(self):
+        writer = PostWriter(max_batch=3, max_delay=30)
+        error = OperationalError('INSERT', {}, Exception('database is locked'))
+
+        with mock.patch.object(PostWriter, 'write', side_effect=error) as write:
+            for i in range(10):
+                writer.add(make_post(f't3_{i}'))
+
+        self.assertEqual(1, write.call_count)
+        self.assertEqual(10, len(writer.buffer))
+        self.assertEqual(10, writer.flush())
+
+    def test_timer_survives_errors(self):
+        flushed = threading.Event()
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            flushed.set()
+
+        self.writer.add(make_post('t3_a'))
+        with mock.patch.object(self.writer, 'flush', side_effect=flush):
+            self.writer.start()
+            self.assertTrue(flushed.wait(5))
+            self.writer.stopped.set()
+            self.writer.timer.join()
+            self.writer.timer = None
+
+
+if __name__ == '__main__':
+    unittest.main()
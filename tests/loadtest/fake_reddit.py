@@ -0,0 +1,87 @@
+"""
+Stand-in for a praw subreddit that emits synthetic submissions linking to
+store pages at a chosen rate, and records when each one was replied to.
+"""
+import itertools
+import time
+
+
+"""
+Product urls by store domain, {n} is replaced with a per-submission number
+so each submission links to a different product
+"""
+URL_TEMPLATES = {
+    'amazon.com': 'http://www.amazon.com/dp/B0{n:08d}',
+    'bestbuy.com': 'http://www.bestbuy.com/site/product/{n}.p',
+    'ebay.com': 'http://www.ebay.com/itm/{n}',
+    'frys.com': 'http://www.frys.com/product/{n}',
+    'microcenter.com': 'http://www.microcenter.com/product/{n}/load-test',
+    'newegg.com': 'http://www.newegg.com/p/N82E{n:011d}',
+    'rakuten.com': 'http://www.rakuten.com/shop/load/product/{n}/',
+}
+
+
+class FakeSubmission:
+    """
+    :attr fullname: str, ex 't3_lt00000001'
+    :attr title: str
+    :attr url: str, product url
+    :attr created: float, epoch seconds
+    :attr emitted_at: float, time.monotonic() the stream yielded it
+    :attr replied_at: float, time.monotonic() of reply(), or None
+    :attr markdown: str, reply body, or None
+    :attr subreddit: FakeSubreddit, subreddit posted to
+    """
+    def __init__(self, number: int, url: str, subreddit=None):
+        self.fullname = f't3_lt{number:08d}'
+        self.title = f'[Load test] submission {number}'
+        self.url = url
+        self.created = time.time()
+        self.emitted_at = None
+        self.replied_at = None
+        self.markdown = None
+        self.subreddit = subreddit
+
+    def reply(self, markdown: str):
+        self.replied_at = time.monotonic()
+        self.markdown = markdown
+
+
+class FakeStream:
+
+    def __init__(self, subreddit):
+        self.subreddit = subreddit
+
+    def submissions(self):
+        """Yields subreddit.count submissions, rate per second"""
+        interval = 1 / self.subreddit.rate
+        start = time.monotonic()
+        for i, submission in enumerate(self.subreddit.submissions):
+            delay = start + i * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            submission.emitted_at = time.monotonic()
+            yield submission
+
+
+class FakeSubreddit:
+    """
+    :attr display_name: str, subreddit name
+    :attr rate: float, submissions emitted per second
+    :attr submissions: list of FakeSubmission, in emit order, cycling
+    through domains
+    """
+    def __init__(self, domains: list, count: int, rate: float,
+                 display_name: str='loadtest'):
+        self.display_name = display_name
+        self.rate = rate
+        urls = itertools.cycle(domains)
+        self.submissions = [
+            FakeSubmission(n, URL_TEMPLATES[next(urls)].format(n=n), self)
+            for n in range(1, count + 1)
+        ]
+        self.stream = FakeStream(self)
+
+    def new(self, limit: int=None):
+        """Submissions newest first, like praw's subreddit.new"""
+        return list(reversed(self.submissions))[:limit]
@@ -0,0 +1,122 @@
+"""
+End-to-end load test: drives the real Bot pipeline with a FakeSubreddit
+against a local StoreServer and a throwaway sqlite database, then reports
+throughput and time from post to reply.
+
+Run from /src:
+    PYTHONPATH=.. python -m tests.loadtest.run_load_test --count 200 --rate 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from tests.loadtest.fake_reddit import FakeSubreddit, URL_TEMPLATES
+from tests.loadtest.store_server import StoreServer
+
+
+def percentile(ordered: list, pct: float):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return float('nan')
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=100,
+                        help='submissions to emit')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='submissions emitted per second')
+    parser.add_argument('--domains', nargs='+', default=sorted(URL_TEMPLATES),
+                        help='store domains submissions link to, in rotation')
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='seconds added to every store response')
+    parser.add_argument('--jitter', type=float, default=0.05,
+                        help='up to this many seconds added at random')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of store requests answered with a 503')
+    parser.add_argument('--reply-delay', type=float, default=None,
+                        help="overrides Bot.reply_delay, seconds")
+    parser.add_argument('--backfill', action='store_true',
+                        help='run Bot.backfill over the submissions instead of streaming')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """
+    Runs the bot until every fake submission has been handled
+    :return: dict, load test results
+    """
+    work_dir = tempfile.mkdtemp(prefix='bapcs-loadtest-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{work_dir}/loadtest.sqlite'
+
+    from database.base import Base, SessionMode, get_engine, session_scope
+    from main import Bot
+    from models.lease import Lease
+    from models.post import Post
+    from network import client
+
+    Base.metadata.create_all(get_engine())
+    client.CACHE_PATH = os.path.join(work_dir, 'responses.sqlite')
+
+    server = StoreServer(latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate)
+    server.start()
+    client.get_session().proxies = {'http': server.url, 'https': server.url}
+
+    subreddit = FakeSubreddit(args.domains, args.count, args.rate)
+    if args.reply_delay is not None:
+        Bot.reply_delay = args.reply_delay
+    bot = Bot(subreddit.display_name, subreddit=subreddit)
+
+    start = time.monotonic()
+    if args.backfill:
+        bot.backfill()
+    else:
+        bot.run()
+        bot.stop()
+    elapsed = time.monotonic() - start
+    server.shutdown()
+
+    with session_scope(SessionMode.READ) as session:
+        written = session.query(Post).count()
+        leases_done = session.query(Lease).filter(Lease.done.is_(True)).count()
+    replied = [submission for submission in subreddit.submissions
+               if submission.replied_at is not None]
+    latencies = sorted(submission.replied_at - submission.emitted_at
+                       for submission in replied)
+
+    return {
+        'emitted': len(subreddit.submissions),
+        'written': written,
+        'leases_done': leases_done,
+        'replied': len(replied),
+        'elapsed': elapsed,
+        'throughput': written / elapsed,
+        'store_requests': server.requests,
+        'reply_p50': percentile(latencies, 50),
+        'reply_p90': percentile(latencies, 90),
+        'reply_p99': percentile(latencies, 99),
+    }
+
+
+def format_report(results: dict):
+    return (f'emitted {results["emitted"]} submissions, '
+            f'{results["written"]} written to db, '
+            f'{results["replied"]} replied to, '
+            f'{results["leases_done"]} claims completed\n'
+            f'elapsed {results["elapsed"]:.1f} s, '
+            f'throughput {results["throughput"]:.2f} submissions/s\n'
+            f'store requests {results["store_requests"]} '
+            f'({results["store_requests"] / max(1, results["emitted"]):.1f} '
+            f'per submission)\n'
+            f'post to reply p50 {results["reply_p50"]:.2f} s, '
+            f'p90 {results["reply_p90"]:.2f} s, '
+            f'p99 {results["reply_p99"]:.2f} s')
+
+
+if __name__ == '__main__':
+    print(format_report(run(parse_args(sys.argv[1:]))))
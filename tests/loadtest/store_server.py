@@ -0,0 +1,136 @@
+"""
+Stand-in store server for load tests.  Acts as an HTTP proxy: the bot's
+session is pointed at it, and each request is answered with the fixture
+page for the requested store domain, after a configurable delay.  Requests
+may be failed at random with a 503 to exercise error handling.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'benchmarks', 'fixtures')
+
+"""
+Store domain: fixture page.  Microcenter store inventory pages are
+requested with a non-default storeSelected cookie, see fixture_for
+"""
+FIXTURES = {
+    'amazon.com': 'amazon.html',
+    'bestbuy.com': 'bestbuy.html',
+    'ebay.com': 'ebay.html',
+    'frys.com': 'frys.html',
+    'microcenter.com': 'microcenter.html',
+    'newegg.com': 'newegg.html',
+    'rakuten.com': 'rakuten.html',
+}
+MICROCENTER_STORE_FIXTURE = 'microcenter_store.html'
+
+
+def load_pages():
+    pages = {}
+    for name in set(FIXTURES.values()) | {MICROCENTER_STORE_FIXTURE}:
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            pages[name] = f.read()
+    return pages
+
+
+def fixture_for(host: str, cookie: str):
+    """
+    Picks the fixture page for a request
+    :param host: str, requested hostname, ex 'www.newegg.com'
+    :param cookie: str, Cookie header or ''
+    :return: str, fixture name; None if no store matches host
+    """
+    for domain, fixture in FIXTURES.items():
+        if host == domain or host.endswith('.' + domain):
+            if domain == 'microcenter.com' and 'storeSelected=' in cookie \
+                    and 'storeSelected=095' not in cookie:
+                return MICROCENTER_STORE_FIXTURE
+            return fixture
+    return None
+
+
+class StoreServer(ThreadingMixIn, HTTPServer):
+    """
+    :attr latency: float, seconds added to every response
+    :attr jitter: float, up to this many seconds added at random
+    :attr error_rate: float, 0-1, share of requests answered with a 503
+    :attr requests: int, requests served
+    """
+    daemon_threads = True
+
+    def __init__(self, port: int=0, latency: float=0.1, jitter: float=0.05,
+                 error_rate: float=0.0):
+        super().__init__(('127.0.0.1', port), StoreRequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pages = load_pages()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def handle_error(self, request, client_address):
+        # clients closing pooled or half-read connections is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class StoreRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_CONNECT(self):
+        # https is not proxied, stores are requested over http in load tests
+        self.send_error(502, 'https not supported by stand-in server')
+
+    def respond(self, send_body: bool):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        host = urlsplit(self.path).hostname or self.headers.get('Host', '')
+        fixture = fixture_for(host, self.headers.get('Cookie', ''))
+        if fixture is None:
+            self.send_error(404)
+            return
+        if random.random() < server.error_rate:
+            self.send_error(503)
+            return
+
+        body = server.pages[fixture]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # client stopped reading early, see client.get_until
+                pass
+
+    def log_message(self, format, *args):
+        pass
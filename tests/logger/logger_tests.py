@@ -0,0 +1,61 @@
+import gzip
+import logging
+import os
+import tempfile
+import unittest
+
+from src.logger.logger import *
+
+
+def make_record(level=logging.ERROR, lineno=10):
+    return logging.LogRecord('Test', level, 'test.py', lineno, 'msg', None, None)
+
+
+class SamplingFilterTests(unittest.TestCase):
+    def test_passes_non_errors(self):
+        sampler = SamplingFilter(60, 0, 10)
+        self.assertTrue(all(sampler.filter(make_record(logging.INFO))
+                            for _ in range(20)))
+
+    def test_samples_after_burst(self):
+        sampler = SamplingFilter(60, 3, 5)
+        passed = [sampler.filter(make_record()) for _ in range(13)]
+        self.assertEqual(passed.count(True), 5)
+        self.assertTrue(all(passed[:3]))
+
+    def test_counts_per_line(self):
+        sampler = SamplingFilter(60, 1, 100)
+        self.assertTrue(sampler.filter(make_record(lineno=1)))
+        self.assertTrue(sampler.filter(make_record(lineno=2)))
+        self.assertFalse(sampler.filter(make_record(lineno=1)))
+
+    def test_window_resets(self):
+        sampler = SamplingFilter(0, 1, 100)
+        self.assertTrue(sampler.filter(make_record()))
+        self.assertTrue(sampler.filter(make_record()))
+
+
+class GetLoggerTests(unittest.TestCase):
+    def test_shares_handler_per_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'shared.log')
+            first = get_logger('SharedA', path)
+            second = get_logger('SharedB', path)
+            get_logger('SharedA', path)
+            self.assertEqual(len(first.handlers), 1)
+            self.assertIs(first.handlers[0], second.handlers[0])
+
+    def test_gzip_rotator(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'logfile.log')
+            with open(source, 'w') as f:
+                f.write('line\n')
+            dest = gzip_namer(f'{source}.1')
+            gzip_rotator(source, dest)
+            self.assertFalse(os.path.exists(source))
+            with gzip.open(dest, 'rt') as f:
+                self.assertEqual(f.read(), 'line\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
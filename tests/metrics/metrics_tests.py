@@ -0,0 +1,59 @@
+import unittest
+
+from src.metrics.metrics import *
+
+
+class MetricsTests(unittest.TestCase):
+
+    def test_counter_render(self):
+        requests = Counter('test_requests_total', 'Requests')
+        requests.inc(domain='newegg.com')
+        requests.inc(2, domain='newegg.com')
+        requests.inc(domain='amazon.com')
+
+        expected = [
+            '# HELP test_requests_total Requests',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{domain="amazon.com"} 1',
+            'test_requests_total{domain="newegg.com"} 3',
+        ]
+        self.assertEqual(expected, requests.render())
+
+    def test_histogram_render(self):
+        latency = Histogram('test_seconds', 'Latency', buckets=(0.1, 1))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        expected = [
+            '# HELP test_seconds Latency',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 1',
+            'test_seconds_bucket{le="1"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            'test_seconds_sum 5.55',
+            'test_seconds_count 3',
+        ]
+        self.assertEqual(expected, latency.render())
+
+    def test_registered_once_by_name(self):
+        first = counter('test_registered_total', 'Registered')
+        second = counter('test_registered_total', 'Registered')
+
+        self.assertIs(first, second)
+        self.assertIn('# TYPE test_registered_total counter', render())
+
+    def test_timed_observes_calls(self):
+        latency = Histogram('test_timed_seconds', 'Timed')
+
+        @timed(latency, template='test')
+        def render_markdown():
+            return 'markdown'
+
+        self.assertEqual('markdown', render_markdown())
+        self.assertIn('test_timed_seconds_count{template="test"} 1',
+                      latency.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+from src.network.breaker import *
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def test_opens_on_failure_rate(self):
+        store = CircuitBreaker('test.com', window=10, min_results=4, failure_rate=0.5)
+        for success in [True, False, True]:
+            store.record(success)
+        self.assertTrue(store.allow())
+
+        store.record(False)
+        self.assertEqual(OPEN, store.state)
+        self.assertFalse(store.allow())
+
+    def test_half_open_single_probe(self):
+        store = CircuitBreaker('test.com', min_results=1, cooldown=10)
+        with mock.patch('time.monotonic', return_value=100):
+            store.record(False)
+        with mock.patch('time.monotonic', return_value=111):
+            self.assertTrue(store.allow())
+            self.assertEqual(HALF_OPEN, store.state)
+            self.assertFalse(store.allow())
+
+        store.record(True)
+        self.assertEqual(CLOSED, store.state)
+        self.assertTrue(store.allow())
+
+    def test_failed_probe_backs_off(self):
+        store = CircuitBreaker('test.com', min_results=1, cooldown=10, max_cooldown=15)
+        with mock.patch('time.monotonic', return_value=100):
+            store.record(False)
+        with mock.patch('time.monotonic', return_value=111):
+            store.allow()
+            store.record(False)
+        with mock.patch('time.monotonic', return_value=122):
+            self.assertFalse(store.allow())
+        with mock.patch('time.monotonic', return_value=127):
+            self.assertTrue(store.allow())
+        self.assertEqual(15, store.current_cooldown)
+
+    def test_retry_in(self):
+        store = CircuitBreaker('test.com', min_results=1, cooldown=10)
+        self.assertEqual(0, store.retry_in())
+        with mock.patch('time.monotonic', return_value=100):
+            store.record(False)
+        with mock.patch('time.monotonic', return_value=104):
+            self.assertEqual(6, store.retry_in())
+        with mock.patch('time.monotonic', return_value=111):
+            self.assertEqual(0, store.retry_in())
+
+    def test_retry_in_while_probing(self):
+        store = CircuitBreaker('test.com', min_results=1, cooldown=10)
+        with mock.patch('time.monotonic', return_value=100):
+            store.record(False)
+        with mock.patch('time.monotonic', return_value=111):
+            self.assertTrue(store.allow())
+            self.assertFalse(store.allow())
+            self.assertEqual(PROBE_WAIT, store.retry_in())
+        store.record(True)
+        self.assertEqual(0, store.retry_in())
+
+    def test_get_breaker_shared(self):
+        self.assertIs(get_breaker('shared.com'), get_breaker('shared.com'))
+        self.assertEqual('closed', get_states()['shared.com'])
+
+
+if __name__ == '__main__':
+    unittest.main()
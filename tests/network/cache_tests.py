@@ -0,0 +1,132 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from urllib3 import HTTPResponse
+
+from src.network import client
+from src.network.cache import *
+
+
+def make_response(url, body, status_code=200, headers=None):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = 'utf-8'
+    response.raw = HTTPResponse(body=io.BytesIO(body), preload_content=False)
+    return response
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'responses.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_and_get(self):
+        cache = ResponseCache(self.path)
+        url = 'https://www.newegg.com/p/N82E16813144219'
+        key = cache.make_key(url)
+        cache.store(key, make_response(url, b'<html></html>',
+                                       headers={'ETag': '"abc"'}))
+
+        cached = cache.get(key)
+
+        self.assertEqual(b'<html></html>', cached.to_response().content)
+        self.assertEqual({'If-None-Match': '"abc"'}, cached.conditional_headers())
+        self.assertTrue(cached.is_fresh(60))
+
+    def test_key_varies_on_cookie(self):
+        url = 'https://www.microcenter.com/product/501644'
+
+        self.assertNotEqual(
+            ResponseCache.make_key(url, {'Cookie': 'storeSelected=095'}),
+            ResponseCache.make_key(url, {'Cookie': 'storeSelected=101'}),
+        )
+
+    def test_least_recently_used_evicted(self):
+        cache = ResponseCache(self.path, max_bytes=10)
+        for name in ['a', 'b']:
+            cache.store(name, make_response(name, b'12345'))
+        # reading 'a' makes 'b' the least recently used
+        with mock.patch('src.network.cache.time.time', return_value=2e9):
+            cache.get('a')
+        evictions = COUNTERS['evictions'].values.get((), 0)
+        cache.store('c', make_response('c', b'12345'))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(1, cache.stats()['evictions'])
+        self.assertEqual(evictions + 1, COUNTERS['evictions'].values[()])
+
+
+class CachedGetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'responses.sqlite')
+        self.cache = ResponseCache(path)
+        self.session = mock.Mock()
+        patches = [
+            mock.patch('src.network.client.get_cache', return_value=self.cache),
+            mock.patch('src.network.client.get_session', return_value=self.session),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fresh_entry_skips_request(self):
+        url = 'https://www.bestbuy.com/site/5293502.p'
+        self.session.get.return_value = make_response(url, b'page')
+        hits = COUNTERS['hits'].values.get((), 0)
+
+        client.get(url, ttl=60)
+        response = client.get(url, ttl=60)
+
+        self.assertEqual(b'page', response.content)
+        self.assertEqual(1, self.session.get.call_count)
+        self.assertEqual(1, self.cache.stats()['hits'])
+        self.assertEqual(1, self.cache.stats()['misses'])
+        self.assertEqual(hits + 1, COUNTERS['hits'].values[()])
+
+    def test_stale_entry_revalidated(self):
+        url = 'https://www.bestbuy.com/site/5293502.p'
+        self.session.get.return_value = make_response(
+            url, b'page', headers={'Last-Modified': 'Mon, 01 Jul 2019 00:00:00 GMT'}
+        )
+        client.get(url, ttl=60)
+
+        self.session.get.return_value = make_response(url, b'', status_code=304)
+        with mock.patch('src.network.cache.time.time', return_value=2e9):
+            response = client.get(url, ttl=60)
+
+        _, kwargs = self.session.get.call_args
+        self.assertEqual('Mon, 01 Jul 2019 00:00:00 GMT',
+                         kwargs['headers']['If-Modified-Since'])
+        self.assertEqual(b'page', response.content)
+        self.assertEqual(1, self.cache.stats()['revalidations'])
+
+    def test_no_ttl_bypasses_cache(self):
+        url = 'https://www.bestbuy.com/site/5293502.p'
+        self.session.get.return_value = make_response(url, b'page')
+
+        client.get(url)
+        client.get(url)
+
+        self.assertEqual(2, self.session.get.call_count)
+        self.assertEqual(0, self.cache.stats()['entries'])
+
+
+if __name__ == '__main__':
+    unittest.main()
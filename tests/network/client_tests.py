@@ -0,0 +1,191 @@
+import gzip
+import io
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import mock
+
+import requests
+from urllib3 import HTTPResponse
+
+from src.network import client
+
+
+def make_streamed_response(url, body, headers=None):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    response.encoding = 'utf-8'
+    response.raw = HTTPResponse(body=io.BytesIO(body), headers=headers,
+                                preload_content=False)
+    return response
+
+
+class GetUntilTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        patch = mock.patch('src.network.client.get_session',
+                           return_value=self.session)
+        patch.start()
+        self.addCleanup(patch.stop)
+        client.stream_stats.clear()
+        client.full_sizes.clear()
+
+    def test_stops_once_all_anchors_match(self):
+        url = 'https://www.microcenter.com/product/501644'
+        head = b'dataLayer = [{"mpn": "x"}];\ninventory = [];\n'
+        body = head + b'x' * (client.CHUNK_SIZE * 4)
+        self.session.get.return_value = make_streamed_response(
+            url, body, {'Content-Length': str(len(body))}
+        )
+
+        response = client.get_until(url, [r'(?s)dataLayer = \[.*?\];',
+                                          r'inventory = [^\n]*\n'])
+
+        self.assertTrue(response.text.startswith(head.decode()))
+        self.assertEqual(client.CHUNK_SIZE, len(response.content))
+        stats = client.stream_stats['www.microcenter.com']
+        self.assertEqual(1, stats['stopped_early'])
+        self.assertEqual(len(body) - client.CHUNK_SIZE, stats['bytes_saved'])
+
+    def test_reads_everything_if_anchor_missing(self):
+        url = 'https://www.newegg.com/p/N82E16813144219'
+        body = b'y' * (client.CHUNK_SIZE * 2 + 10)
+        self.session.get.return_value = make_streamed_response(url, body)
+
+        response = client.get_until(url, [r"product_model:\['[^\n]*\n"])
+
+        self.assertEqual(body, response.content)
+        stats = client.stream_stats['www.newegg.com']
+        self.assertEqual(0, stats['stopped_early'])
+        self.assertEqual(0, stats['bytes_saved'])
+
+    def test_chunked_saved_unknown_until_full_read(self):
+        url = 'https://www.newegg.com/p/N82E16813144219'
+        body = b"product_model:['x']\n" + b'y' * (client.CHUNK_SIZE * 4)
+        anchors = [r"product_model:\['[^\n]*\n"]
+
+        self.session.get.return_value = make_streamed_response(url, body)
+        client.get_until(url, anchors)
+        stats = client.stream_stats['www.newegg.com']
+        self.assertEqual(1, stats['saved_unknown'])
+        self.assertEqual(0, stats['bytes_saved'])
+
+        self.session.get.return_value = make_streamed_response(url, body)
+        client.get_until(url, ['never matches'])
+        self.session.get.return_value = make_streamed_response(url, body)
+        client.get_until(url, anchors)
+
+        self.assertEqual(1, stats['saved_unknown'])
+        self.assertEqual(len(body) - client.CHUNK_SIZE, stats['bytes_saved'])
+        saved = client.stream_bytes_saved.values[
+            (('basis', 'estimate'), ('domain', 'newegg.com'))
+        ]
+        self.assertGreaterEqual(saved, len(body) - client.CHUNK_SIZE)
+
+
+class FetchBytesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        patch = mock.patch('src.network.client.get_session',
+                           return_value=self.session)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def wire_bytes(self, domain):
+        return client.fetch_bytes.values.get((('domain', domain),), 0)
+
+    def test_both_paths_count_compressed_bytes(self):
+        url = 'https://www.newegg.com/p/N82E16813144219'
+        body = b'<html>' + b'z' * 50000 + b'</html>'
+        compressed = gzip.compress(body)
+        headers = {'Content-Encoding': 'gzip'}
+
+        for get in (lambda: client.get(url),
+                    lambda: client.get_until(url, ['never matches'])):
+            with self.subTest(get=get):
+                self.session.get.return_value = make_streamed_response(url, compressed, headers)
+                before = self.wire_bytes('newegg.com')
+
+                response = get()
+
+                self.assertEqual(body, response.content)
+                self.assertEqual(len(compressed), self.wire_bytes('newegg.com') - before)
+
+
+class PeerRecordingHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler recording the client port of every request"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.peers.append(self.client_address[1])
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PeerRecordingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), PeerRecordingHandler)
+        self.peers = []
+        self.lock = threading.Lock()
+
+
+class SessionPoolingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = PeerRecordingServer()
+        threading.Thread(target=self.server.serve_forever, args=(0.05,),
+                         daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        patch = mock.patch.multiple('src.network.client',
+                                    _session=None,
+                                    POOL_MAXSIZE=client.POOL_MAXSIZE)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_session_shared(self):
+        self.assertIs(client.get_session(), client.get_session())
+
+    def test_sequential_requests_reuse_connection(self):
+        for _ in range(5):
+            client.get(self.url)
+
+        self.assertEqual(5, len(self.server.peers))
+        self.assertEqual(1, len(set(self.server.peers)))
+
+    def test_sized_pool_keeps_concurrent_connections(self):
+        concurrency = client.POOL_MAXSIZE * 2
+        client.size_pool(concurrency)
+        barrier = threading.Barrier(concurrency)
+
+        def get(_):
+            barrier.wait()
+            return client.get(self.url).status_code
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            for _ in range(3):
+                self.assertEqual([200] * concurrency,
+                                 list(executor.map(get, range(concurrency))))
+
+        # every connection opened by the first round went back to the pool
+        self.assertLessEqual(len(set(self.server.peers)), concurrency)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from src.network.ratelimit import *
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=0.001, capacity=3)
+
+        self.assertEqual([True, True, True, False],
+                         [bucket.try_acquire() for _ in range(4)])
+        self.assertGreater(bucket.delay(), 900)
+
+    def test_unlimited_rate(self):
+        bucket = TokenBucket(rate=float('inf'))
+
+        self.assertTrue(all(bucket.try_acquire() for _ in range(100)))
+        self.assertEqual(0, bucket.delay())
+
+    def test_pause_empties_bucket(self):
+        bucket = TokenBucket(rate=float('inf'))
+        bucket.pause(60)
+
+        self.assertFalse(bucket.try_acquire())
+        self.assertGreater(bucket.delay(), 59)
+        self.assertFalse(bucket.acquire(timeout=0.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
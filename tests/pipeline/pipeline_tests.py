@@ -0,0 +1,69 @@
+import threading
+import unittest
+
+from src.pipeline.pipeline import *
+
+
+class PipelineTests(unittest.TestCase):
+
+    def test_items_flow_through_every_stage(self):
+        results = []
+        pipeline = Pipeline([
+            Stage('double', lambda x: x * 2, workers=3),
+            Stage('increment', lambda x: x + 1),
+            Stage('collect', results.append),
+        ])
+        pipeline.start()
+        for i in range(10):
+            pipeline.put(i)
+        pipeline.stop()
+
+        self.assertEqual([i * 2 + 1 for i in range(10)], sorted(results))
+
+    def test_none_results_are_not_passed_on(self):
+        results = []
+        pipeline = Pipeline([
+            Stage('filter', lambda x: x if x % 2 else None),
+            Stage('collect', results.append),
+        ])
+        pipeline.start()
+        for i in range(6):
+            pipeline.put(i)
+        pipeline.stop()
+
+        self.assertEqual([1, 3, 5], results)
+
+    def test_handler_exception_does_not_stop_worker(self):
+        results = []
+
+        def handler(x):
+            if x == 0:
+                raise ValueError('bad item')
+            results.append(x)
+
+        stage = Stage('flaky', handler)
+        stage.start()
+        stage.put(0)
+        stage.put(1)
+        stage.stop()
+
+        self.assertEqual([1], results)
+
+    def test_depths_reports_waiting_items(self):
+        release = threading.Event()
+        stage = Stage('blocked', lambda x: release.wait(), maxsize=10)
+        pipeline = Pipeline([stage])
+        for i in range(3):
+            pipeline.put(i)
+
+        self.assertEqual({'blocked': 3}, pipeline.depths())
+
+        pipeline.start()
+        release.set()
+        pipeline.stop()
+
+        self.assertEqual({'blocked': 0}, pipeline.depths())
+
+
+if __name__ == '__main__':
+    unittest.main()
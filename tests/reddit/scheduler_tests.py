@@ -0,0 +1,92 @@
+import time
+import unittest
+
+from src.reddit.scheduler import *
+
+
+class FakeSubmission:
+    def __init__(self, fullname):
+        self.fullname = fullname
+
+
+class ReplySchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.limited = []
+
+    def reply(self, submission, markdown):
+        if self.limited:
+            return self.limited.pop()
+        self.sent.append((submission.fullname, markdown))
+        return None
+
+    def test_sends_in_order(self):
+        replies = ReplyScheduler(self.reply, max_rate=float('inf'))
+        replies.submit(FakeSubmission('t3_a'), 'first')
+        replies.submit(FakeSubmission('t3_b'), 'second')
+        replies.start()
+        replies.stop(timeout=5)
+
+        self.assertEqual([('t3_a', 'first'), ('t3_b', 'second')], self.sent)
+
+    def test_merges_pending_for_same_submission(self):
+        replies = ReplyScheduler(self.reply, max_rate=float('inf'))
+        replies.submit(FakeSubmission('t3_a'), 'first')
+        replies.submit(FakeSubmission('t3_a'), 'second')
+
+        self.assertEqual(1, len(replies))
+        replies.start()
+        replies.stop(timeout=5)
+        self.assertEqual([('t3_a', 'second')], self.sent)
+
+    def test_drops_expired(self):
+        finished = []
+        replies = ReplyScheduler(self.reply, max_rate=float('inf'), max_age=0,
+                                 on_finished=lambda s, sent: finished.append((s.fullname, sent)))
+        replies.submit(FakeSubmission('t3_a'), 'first')
+        replies.start()
+        replies.stop(timeout=5)
+
+        self.assertEqual([], self.sent)
+        self.assertEqual([('t3_a', False)], finished)
+
+    def test_on_finished_after_sent(self):
+        finished = []
+
+        def on_finished(submission, sent):
+            # the reply has gone out by the time the callback runs
+            finished.append((submission.fullname, sent, len(self.sent)))
+
+        replies = ReplyScheduler(self.reply, max_rate=float('inf'),
+                                 on_finished=on_finished)
+        replies.submit(FakeSubmission('t3_a'), 'first')
+        replies.start()
+        replies.stop(timeout=5)
+
+        self.assertEqual([('t3_a', True, 1)], finished)
+
+    def test_ratelimit_requeues_and_backs_off(self):
+        replies = ReplyScheduler(self.reply, max_rate=1, min_rate=0.01)
+        self.limited.append(60)
+        replies.submit(FakeSubmission('t3_a'), 'first')
+        replies.start()
+        deadline = time.monotonic() + 5
+        while self.limited and time.monotonic() < deadline:
+            time.sleep(0.01)
+        replies.stop(timeout=0)
+
+        self.assertEqual([], self.sent)
+        self.assertEqual(0.5, replies.learned_rate)
+        self.assertGreater(replies.bucket.delay(), 50)
+
+    def test_limits_cap_rate(self):
+        replies = ReplyScheduler(self.reply, max_rate=1, min_rate=0.001)
+        replies.on_limits({'remaining': 10, 'reset_timestamp': time.time() + 100})
+
+        self.assertAlmostEqual(0.1, replies.bucket.rate, places=2)
+        self.assertAlmostEqual(10, replies.delay(), places=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from src.reddit.subreddits import *
+
+
+CONFIG = """
+[DEFAULT]
+Reply = microcenter.com
+DatabaseOnly = all
+
+[hardwareswap]
+Reply =
+DatabaseOnly = ebay.com, Newegg.com
+
+[buildapcsalescanada]
+Reply = ebay.com
+"""
+
+DATABASE_ONLY_CONFIG = """
+[DEFAULT]
+Reply = all
+DatabaseOnly =
+
+[hardwareswap]
+DatabaseOnly = all
+"""
+
+
+class SubredditConfigTests(unittest.TestCase):
+
+    def setUp(self):
+        parser = make_parser()
+        parser.read_string(CONFIG)
+        self.config = SubredditConfig(parser)
+
+    def test_section_overrides_default(self):
+        self.assertIsNone(self.config.mode('hardwareswap', 'microcenter.com'))
+        self.assertEqual(DATABASE_ONLY, self.config.mode('HardwareSwap', 'newegg.com'))
+        self.assertIsNone(self.config.mode('hardwareswap', 'amazon.com'))
+
+    def test_default_for_unlisted_subreddit(self):
+        self.assertEqual(REPLY, self.config.mode('buildapcsales', 'microcenter.com'))
+        self.assertEqual(DATABASE_ONLY, self.config.mode('buildapcsales', 'amazon.com'))
+
+    def test_section_without_database_only_inherits_it(self):
+        self.assertEqual(REPLY, self.config.mode('buildapcsalescanada', 'ebay.com'))
+        self.assertEqual(DATABASE_ONLY, self.config.mode('buildapcsalescanada', 'amazon.com'))
+
+    def test_database_only_section_does_not_inherit_reply(self):
+        parser = make_parser()
+        parser.read_string(DATABASE_ONLY_CONFIG)
+        config = SubredditConfig(parser)
+
+        self.assertEqual(DATABASE_ONLY, config.mode('hardwareswap', 'microcenter.com'))
+        self.assertEqual(REPLY, config.mode('buildapcsales', 'microcenter.com'))
+
+    def test_example_config(self):
+        config = load_config(os.path.join(os.path.dirname(__file__),
+                                          '..', '..', 'examples', 'subreddits.ini'))
+
+        self.assertEqual(DATABASE_ONLY, config.mode('hardwareswap', 'microcenter.com'))
+        self.assertEqual(REPLY, config.mode('buildapcsales', 'microcenter.com'))
+        self.assertEqual(DATABASE_ONLY, config.mode('buildapcsales', 'newegg.com'))
+
+    def test_missing_file_replies_for_all(self):
+        config = load_config('./no-such-subreddits.ini')
+
+        self.assertEqual(REPLY, config.mode('buildapcsales', 'amazon.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,66 @@
+import unittest
+
 from src.stores.ebay import *
 
 
+LISTING = (
+    '<html><body>'
+    '<a id="mbgLink" aria-label="Member id\xa0best_seller">best_seller</a>'
+    '<a href="#" title="feedback score: 12345">12345</a>'
+    '<div id="si-fb">99.5%\xa0Positive feedback</div>'
+    '<span id="prcIsum">US $249.99</span>'
+    '<h2 itemprop="mpn">GV-N108TAORUS-11GD</h2>'
+    '<div id="descItemNumber">263771931884</div>'
+    '</body></html>'
+)
+
+
+class EbayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = build_index(html.fromstring(LISTING))
+
+    def test_listing_fields(self):
+        self.assertEqual('best_seller', get_seller(self.index))
+        self.assertEqual('12,345', get_feedback(self.index))
+        self.assertEqual('99.5%', get_score(self.index))
+        self.assertEqual('263771931884', get_item_number(self.index))
+        self.assertEqual('GV-N108TAORUS-11GD', get_mpn(self.index))
+        self.assertEqual(250, get_price(self.index))
+
+    def test_sale_price_fallback(self):
+        index = build_index(html.fromstring(
+            '<html><body><span id="mm-saleDscPrc">US $99.50</span></body></html>'
+        ))
+
+        self.assertEqual(100, get_price(index))
+
+    def test_missing_fields(self):
+        index = build_index(html.fromstring('<html><body></body></html>'))
+
+        self.assertIsNone(get_seller(index))
+        self.assertIsNone(get_feedback(index))
+        self.assertIsNone(get_mpn(index))
+        self.assertIsNone(get_price(index))
+
+
 class EbaySimulation:
 
     @staticmethod
     def test(url):
         url = convert_pages_url(url)
         page = get_page(url)
-        text = page.text
         content = page.content
         tree = html.fromstring(content)
+        index = build_index(tree)
 
         listing_data = {
-            'Seller': get_seller(tree),
-            'Seller Feedback': get_feedback(text),
-            'Seller Score': get_score(tree),
-            'Ebay Item Number': get_item_number(tree),
-            'MPN (probably)': get_mpn(text),
-            'Price': get_price(tree),
+            'Seller': get_seller(index),
+            'Seller Feedback': get_feedback(index),
+            'Seller Score': get_score(index),
+            'Ebay Item Number': get_item_number(index),
+            'MPN (probably)': get_mpn(index),
+            'Price': get_price(index),
         }
 
         product_details = {
@@ -1,10 +1,16 @@
+import threading
+import time
 import unittest
+from unittest import mock
 
 from src.stores.microcenter import *
 
 
 class MicrocenterTests(unittest.TestCase):
 
+    def setUp(self):
+        inventory_cache.clear()
+
     def test_strip_url_storeID_in_middle(self):
         base_url = 'http://www.microcenter.com/product/501644/HMD_Odyssey_Windows_Mixed_Reality_Headset'
 
@@ -82,6 +88,104 @@ class MicrocenterTests(unittest.TestCase):
 
         self.assertEqual(stripped_url, strip_url(bad_url))
 
+    def test_get_store_data_sorted_by_store_name(self):
+        pages = {
+            '101': b'<span class="inventoryCnt">3 in stock</span>',
+            '131': b'<span class="inventoryCnt">Sold Out</span>',
+            '045': b'<span class="inventoryCnt">5 in stock</span>'
+                   b'<span id="opCostNew">$99.99</span>',
+        }
+
+        def fake_get_page(url, store_num='095', timeout=None):
+            return mock.Mock(content=pages[store_num])
+
+        stores = [('Tustin', '101'), ('Denver', '131'), ('Brentwood', '045')]
+
+        with mock.patch('src.stores.microcenter.get_page', fake_get_page):
+            store_data = get_store_data('http://www.microcenter.com/product/1',
+                                        stores,
+                                        max_workers=3)
+
+        expected = [
+            ('Brentwood', '045', '5 in stock', '$99.99'),
+            ('Tustin', '101', '3 in stock', None),
+        ]
+
+        self.assertTrue(store_data['Open Box'])
+        self.assertEqual(expected, store_data['inventories'])
+
+    def test_get_store_data_repeat_lookup_cached(self):
+        page = mock.Mock(content=b'<span class="inventoryCnt">3 in stock</span>')
+        stores = [('Tustin', '101'), ('Denver', '131')]
+        url = 'http://www.microcenter.com/product/501644/HMD_Odyssey'
+
+        with mock.patch('src.stores.microcenter.get_page',
+                        return_value=page) as get_page:
+            first = get_store_data(url, stores)
+            second = get_store_data(url + '?gclid=abc', stores)
+
+        self.assertEqual(2, get_page.call_count)
+        self.assertEqual(first, second)
+
+    def test_get_store_data_slow_store_unknown(self):
+        release = threading.Event()
+        pages = {
+            '101': b'<span class="inventoryCnt">3 in stock</span>',
+            '131': b'<span class="inventoryCnt">5 in stock</span>',
+        }
+
+        def fake_get_page(url, store_num='095', timeout=None):
+            if store_num == '131':
+                release.wait(5)
+            return mock.Mock(content=pages[store_num])
+
+        stores = [('Tustin', '101'), ('Denver', '131')]
+
+        with mock.patch('src.stores.microcenter.get_page', fake_get_page):
+            start = time.monotonic()
+            # own product id, the late store is cached once it finishes
+            store_data = get_store_data('http://www.microcenter.com/product/999',
+                                        stores,
+                                        timeout=0.2)
+            elapsed = time.monotonic() - start
+            release.set()
+
+        expected = [
+            ('Denver', '131', UNKNOWN_INVENTORY, None),
+            ('Tustin', '101', '3 in stock', None),
+        ]
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(expected, store_data['inventories'])
+
+    def test_get_single_store_data_stale_refreshed_in_background(self):
+        url = 'http://www.microcenter.com/product/501644/HMD_Odyssey'
+        stale = ('Tustin', '101', '3 in stock', None)
+        page = mock.Mock(content=b'<span class="inventoryCnt">1 in stock</span>')
+        inventory_cache.put(('501644', '101'), stale)
+
+        later = time.monotonic() + INVENTORY_TTL + 1
+        with mock.patch('src.stores.microcenter.time.monotonic',
+                        return_value=later), \
+                mock.patch('src.stores.microcenter.refresh_executor') as executor:
+            line = get_single_store_data(url, ('Tustin', '101'))
+
+        self.assertEqual(stale, line)
+        refresh, *args = executor.submit.call_args[0]
+        with mock.patch('src.stores.microcenter.get_page', return_value=page):
+            refresh(*args)
+
+        self.assertEqual(('Tustin', '101', '1 in stock', None),
+                         get_single_store_data(url, ('Tustin', '101')))
+
+    def test_get_product_id(self):
+        urls = {
+            'http://www.microcenter.com/product/501644/HMD_Odyssey': '501644',
+            'http://www.microcenter.com/single_product_results.aspx?sku=782409&': '782409',
+        }
+        for url, product_id in urls.items():
+            self.assertEqual(product_id, get_product_id(url))
+
 
 class MicrocenterSimulation:
 
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from src.stores.registration import *
+
+
+@register('amazon.com')
+def fake_amazon(submission):
+    return None, None
+
+
+@register('newegg.com')
+def fake_newegg(submission):
+    return None, None
+
+
+class RegistrationTests(unittest.TestCase):
+
+    def test_get_site_function_exact_host(self):
+        url = 'https://amazon.com/dp/B077SF8KMG'
+
+        self.assertEqual(('amazon.com', fake_amazon), get_site_function(url))
+
+    def test_get_site_function_subdomains(self):
+        urls = [
+            'https://www.amazon.com/dp/B077SF8KMG',
+            'https://smile.amazon.com/dp/B077SF8KMG',
+        ]
+        for url in urls:
+            self.assertEqual('amazon.com', get_site_name(url))
+
+        url = 'https://m.newegg.com/products/N82E16811352078'
+
+        self.assertEqual('newegg.com', get_site_name(url))
+
+    def test_get_site_function_ignores_query_string(self):
+        url = 'https://redirect.example.com/out?u=amazon.com'
+
+        self.assertEqual((None, None), get_site_function(url))
+
+    def test_get_site_function_ignores_lookalike_host(self):
+        urls = [
+            'https://notamazon.com/dp/B077SF8KMG',
+            'https://amazon.com.example.net/dp/B077SF8KMG',
+        ]
+        for url in urls:
+            self.assertIsNone(get_site_name(url))
+
+    def test_get_site_function_self_post(self):
+        url = 'https://www.reddit.com/r/buildapcsales/comments/a4hafgh/'
+
+        self.assertEqual((None, None), get_site_function(url))
+
+
+class ManifestTests(unittest.TestCase):
+
+    def test_build_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'shop.py'), 'w') as f:
+                f.write("@register_recrawl('shop.com')\n"
+                        "def get_product_details(url): pass\n"
+                        "@register('shop.com')\n"
+                        "def sh_run(submission): pass\n")
+            with open(os.path.join(tmp, 'disabled.py'), 'w') as f:
+                f.write("# @register('disabled.com')\n")
+            with open(os.path.join(tmp, 'registration.py'), 'w') as f:
+                f.write("@register('registration.com')\n")
+
+            self.assertEqual({'shop.com': 'shop'}, build_manifest(tmp))
+
+    def test_manifest_finds_stores(self):
+        self.assertEqual('microcenter', get_manifest()['microcenter.com'])
+        self.assertIn('ebay.com', get_sites())
+
+
+if __name__ == '__main__':
+    unittest.main()
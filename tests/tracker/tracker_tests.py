@@ -0,0 +1,125 @@
+import time
+import unittest
+from unittest import mock
+
+from src.tracker.tracker import *
+from tests.database.helpers import use_memory_db
+
+
+class PriceTrackerTests(unittest.TestCase):
+
+    def setUp(self):
+        use_memory_db()
+        Base.metadata.create_all(get_engine())
+        breaker.breakers.clear()
+        self.prices = []
+        recrawl_functions = mock.patch.dict(registration.recrawl_functions,
+                                            {'newegg.com': self.get_product_details})
+        recrawl_functions.start()
+        self.addCleanup(recrawl_functions.stop)
+
+    def tearDown(self):
+        Base.metadata.drop_all(get_engine())
+
+    def get_product_details(self, url):
+        return {'mpn': 'MPN1', 'price': self.prices.pop(0)}
+
+    def test_ignores_sites_without_recrawl(self):
+        prices = PriceTracker()
+        prices.track('t3_a', 'http://www.example.com/p/1', 'example.com', 'MPN1', 100)
+
+        self.assertEqual(0, len(prices))
+
+    def test_track_saves_later_in_one_batch(self):
+        prices = PriceTracker()
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        prices.track('t3_b', 'http://www.newegg.com/p/2', 'newegg.com', 'MPN2', 100)
+        with session_scope(SessionMode.READ) as session:
+            self.assertEqual(0, session.query(TrackedProduct).count())
+
+        self.assertEqual(2, prices.save_pending())
+        self.assertEqual(0, prices.save_pending())
+        with session_scope(SessionMode.READ) as session:
+            self.assertEqual(2, session.query(TrackedProduct).count())
+
+    def test_track_without_db(self):
+        Base.metadata.drop_all(get_engine())
+        prices = PriceTracker()
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+
+        self.assertEqual(1, len(prices))
+        self.assertEqual(0, prices.save_pending())
+        Base.metadata.create_all(get_engine())
+        self.assertEqual(1, prices.save_pending())
+
+    def test_skips_long_urls(self):
+        prices = PriceTracker()
+        url = 'http://www.newegg.com/p/' + '1' * MAX_URL_LENGTH
+        prices.track('t3_a', url, 'newegg.com', 'MPN1', 100)
+
+        self.assertEqual(0, len(prices))
+
+    def test_stop_saves_pending(self):
+        prices = PriceTracker(min_interval=60)
+        prices.start()
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        prices.stop()
+
+        with session_scope(SessionMode.READ) as session:
+            self.assertEqual(1, session.query(TrackedProduct).count())
+
+    def test_backs_off_until_price_changes(self):
+        prices = PriceTracker(min_interval=60, max_interval=200)
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        product = prices.products['http://www.newegg.com/p/1']
+
+        self.prices = [100, 100, 100, 90]
+        intervals = []
+        for _ in range(4):
+            prices.visit(product)
+            intervals.append(product.interval)
+
+        self.assertEqual([120, 200, 200, 60], intervals)
+        self.assertEqual([100, 100, 100, 90],
+                         [price for date, site, price in price_history.price_history('MPN1')])
+
+    def test_drops_after_failures(self):
+        prices = PriceTracker()
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        product = prices.products['http://www.newegg.com/p/1']
+
+        self.prices = [None] * MAX_FAILURES
+        for _ in range(MAX_FAILURES):
+            prices.visit(product)
+
+        self.assertEqual(0, len(prices))
+        with session_scope(SessionMode.READ) as session:
+            self.assertEqual(0, session.query(TrackedProduct).count())
+
+    def test_domain_budget(self):
+        prices = PriceTracker(min_interval=0, domain_rate=0.001, domain_burst=1)
+        self.prices = [90, 80]
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        prices.track('t3_b', 'http://www.newegg.com/p/2', 'newegg.com', 'MPN1', 100)
+        prices.start()
+        deadline = time.monotonic() + 5
+        while len(self.prices) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        prices.stop()
+
+        self.assertEqual([80], self.prices)
+
+    def test_waits_while_busy(self):
+        prices = PriceTracker(min_interval=0, is_idle=lambda: False)
+        self.prices = [90]
+        prices.track('t3_a', 'http://www.newegg.com/p/1', 'newegg.com', 'MPN1', 100)
+        prices.start()
+        time.sleep(0.1)
+        prices.stop()
+
+        self.assertEqual([90], self.prices)
+
+
+if __name__ == '__main__':
+    unittest.main()